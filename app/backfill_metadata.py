@@ -0,0 +1,18 @@
+"""Compute duration, levels and waveform peaks for existing discussions."""
+
+import argparse
+
+from storage import backfill_metadata
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("names", nargs="*", help="discussion folders (default: all)")
+    parser.add_argument("--force", action="store_true", help="recompute existing metadata")
+    args = parser.parse_args()
+    updated = backfill_metadata(args.names or None, force=args.force)
+    print(f"Updated {updated} segment(s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""Transcription of recordings longer than one Whisper window.
+
+Whisper's own ``transcribe`` walks long audio one 30 second window at a time,
+conditioning each window on the text before it, so its cost grows with the
+length of the recording. :func:`transcribe_long` instead cuts the audio at
+quiet points into overlapping chunks that each fit in one window, decodes
+them together in batches and joins the texts, dropping words repeated where
+neighbouring chunks overlap.
+"""
+
+import re
+from typing import Any, List, Optional, Sequence, Tuple
+
+from constants import CHUNK_BATCH_SIZE
+from utils import profiling
+
+SAMPLE_RATE = 16000
+# Longest chunk handed to the model: one Whisper window
+MAX_CHUNK_SECONDS = 30.0
+# Cuts are searched for between this point of a window and its end
+MIN_CHUNK_SECONDS = 15.0
+# Audio shared by the chunks on either side of a cut
+OVERLAP_SECONDS = 1.0
+# Resolution of the silence search
+FRAME_SECONDS = 0.02
+# Longest run of words treated as repeated across an overlap
+MAX_OVERLAP_WORDS = 8
+
+_WORD = re.compile(r"[\w']+")
+
+
+def frame_energies(audio: Sequence[float], frame: int) -> Optional[List[float]]:
+    """Return the mean power of each run of ``frame`` samples.
+
+    Returns ``None`` when ``audio`` only describes a length (the stub
+    backend decodes files to a ``range``).
+    """
+    if isinstance(audio, range):
+        return None
+    count = len(audio) // frame
+    if hasattr(audio, "reshape"):
+        frames = audio[: count * frame].reshape(count, frame)
+        return (frames * frames).mean(axis=1).tolist()
+    return [
+        sum(x * x for x in audio[i * frame : (i + 1) * frame]) / frame for i in range(count)
+    ]
+
+
+def plan_chunks(
+    total: int,
+    energies: Optional[Sequence[float]] = None,
+    sample_rate: int = SAMPLE_RATE,
+    max_seconds: float = MAX_CHUNK_SECONDS,
+    min_seconds: float = MIN_CHUNK_SECONDS,
+    overlap_seconds: float = OVERLAP_SECONDS,
+    frame_seconds: float = FRAME_SECONDS,
+) -> List[Tuple[int, int]]:
+    """Return ``(start, end)`` sample ranges covering ``total`` samples.
+
+    Each cut is placed in the quietest frame between ``min_seconds`` and the
+    end of the current window, and the chunks on either side extend half of
+    ``overlap_seconds`` past it. No chunk is longer than ``max_seconds``.
+    Without ``energies`` the cuts fall at the end of each window.
+    """
+    max_len = int(max_seconds * sample_rate)
+    if total <= max_len:
+        return [(0, total)]
+    half = int(overlap_seconds * sample_rate / 2)
+    frame = max(1, int(frame_seconds * sample_rate))
+    chunks = []
+    start = 0
+    while total - start > max_len:
+        lo = start + int(min_seconds * sample_rate)
+        hi = start + max_len - half
+        cut = hi
+        if energies:
+            candidates = range(-(-lo // frame), min(hi // frame, len(energies)))
+            if candidates:
+                # prefer the latest of equally quiet frames for fewer chunks
+                quietest = min(candidates, key=lambda f: (energies[f], -f))
+                cut = min(hi, quietest * frame + frame // 2)
+        chunks.append((start, cut + half))
+        start = cut - half
+    chunks.append((start, total))
+    return chunks
+
+
+def split_on_silence(audio: Sequence[float], sample_rate: int = SAMPLE_RATE) -> List[Tuple[int, int]]:
+    """Plan chunks for ``audio`` using its own loudness."""
+    frame = max(1, int(FRAME_SECONDS * sample_rate))
+    return plan_chunks(len(audio), frame_energies(audio, frame), sample_rate)
+
+
+def _normalize(word: str) -> str:
+    return "".join(_WORD.findall(word.lower()))
+
+
+def stitch(texts: Sequence[str], max_overlap_words: int = MAX_OVERLAP_WORDS) -> str:
+    """Join chunk transcripts, removing words repeated across each overlap.
+
+    The longest run of up to ``max_overlap_words`` words that ends the text
+    so far and also starts the next chunk is kept only once. Case and
+    punctuation are ignored when comparing words.
+    """
+    words: List[str] = []
+    for text in texts:
+        new = text.split()
+        for n in range(min(max_overlap_words, len(words), len(new)), 0, -1):
+            if [_normalize(w) for w in words[-n:]] == [_normalize(w) for w in new[:n]]:
+                new = new[n:]
+                break
+        words.extend(new)
+    return " ".join(words)
+
+
+def transcribe_long(backend: Any, model: Any, audio: Any, batch_size: int = CHUNK_BATCH_SIZE) -> str:
+    """Transcribe ``audio`` chunk by chunk with ``backend.transcribe_batch``."""
+    chunks = [audio[start:end] for start, end in split_on_silence(audio)]
+    texts: List[str] = []
+    for i in range(0, len(chunks), max(1, batch_size)):
+        with profiling.span("chunk_batch"):
+            texts.extend(backend.transcribe_batch(model, chunks[i : i + batch_size]))
+    return stitch(texts)
@@ -11,6 +11,9 @@ TEXT_COLOR = "#000000"
 BUTTON_FG = "#d0e7ff"
 BUTTON_HOVER = "#b0d4ff"
 
+# Segments the transcript viewer loads at a time; more load while scrolling
+TRANSCRIPT_PAGE_SEGMENTS = 40
+
 # Recording parameters
 SAMPLE_RATE = 44100
 
@@ -24,9 +27,36 @@ TIMESTAMP_FORMAT = "%Y-%m-%d_%H-%M-%S-%f"
 # ``saved_data`` so the folder doesn't persist between sessions.
 RECORDING_DIR = os.path.join(tempfile.gettempdir(), "clearsay_recordings")
 DISCUSSIONS_DIR = os.path.join(DATA_DIR, "discussions")
+# Lock file guarding a discussion folder against concurrent writers
+DISCUSSION_LOCK_NAME = ".lock"
+# Each API session's current discussion, shared by pre-forked server workers
+SESSIONS_DIR = os.path.join(DATA_DIR, "sessions")
+
+# Recordings left in RECORDING_DIR (e.g. after a failed transcription) are
+# removed once older than RECORDING_MAX_AGE seconds, and oldest first while
+# the folder holds more than RECORDING_MAX_BYTES; see ``retention``
+RECORDING_MAX_AGE = float(os.environ.get("CLEARSAY_RECORDING_MAX_AGE", str(24 * 3600)))
+RECORDING_MAX_BYTES = int(os.environ.get("CLEARSAY_RECORDING_MAX_BYTES", str(512 * 1024 * 1024)))
+# Move them into this folder instead of deleting them
+RECORDING_ARCHIVE_DIR = os.environ.get("CLEARSAY_RECORDING_ARCHIVE", "")
+
+# Transcription backend used by ``model.run_model``: "whisper" for the
+# fine-tuned model or "stub" for load tests without the weights
+TRANSCRIPTION_BACKEND = os.environ.get("CLEARSAY_BACKEND", "whisper")
+# Stub backend behaviour: fixed latency plus seconds per second of audio
+STUB_LATENCY = float(os.environ.get("CLEARSAY_STUB_LATENCY", "0.05"))
+STUB_REAL_TIME_FACTOR = float(os.environ.get("CLEARSAY_STUB_RTF", "0.0"))
+STUB_TEXT = os.environ.get("CLEARSAY_STUB_TEXT", "This is a stub transcription.")
+# Split recordings longer than one Whisper window into chunks decoded as a
+# batch (see ``chunking``) instead of walking them window by window
+LONG_AUDIO_CHUNKING = os.environ.get("CLEARSAY_LONG_AUDIO", "1") != "0"
+# Chunks decoded together in one batch
+CHUNK_BATCH_SIZE = int(os.environ.get("CLEARSAY_CHUNK_BATCH", "8"))
+# Scheduler worker threads shared by every transcription in the process; the
+# Whisper backend still runs one model call at a time
+SCHEDULER_WORKERS = int(os.environ.get("CLEARSAY_SCHEDULER_WORKERS", "1"))
 
 # Timestamp format for discussion folders (no microseconds)
 DISCUSSION_ID_FORMAT = "%Y-%m-%d_%H-%M-%S"
-# Ensure directories exist
-os.makedirs(RECORDING_DIR, exist_ok=True)
-os.makedirs(DISCUSSIONS_DIR, exist_ok=True)
+# Importing this module must stay free of side effects and heavy imports so
+# the desktop window can appear quickly; folders are created on first write.
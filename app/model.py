@@ -1,39 +1,562 @@
-"""Speech-to-text model integration using a fine-tuned Whisper model."""
+"""Speech-to-text model integration using a fine-tuned Whisper model.
 
-from typing import Any
+``torch`` and ``whisper`` are imported lazily by :func:`_load_model` so that
+importing this module is cheap. Call :func:`start_background_load` at startup
+to load the weights and run a warm-up inference off the request path.
+
+The work is delegated to a backend selected by
+:data:`constants.TRANSCRIPTION_BACKEND`. Besides the real Whisper backend a
+deterministic stub is available for load tests that shouldn't depend on the
+model weights or pay for real inference.
+"""
+
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Union
 import os
+import threading
+import time
+import wave
 
-from constants import ROOT_DIR
+import chunking
+from constants import (
+    CHUNK_BATCH_SIZE,
+    LONG_AUDIO_CHUNKING,
+    ROOT_DIR,
+    STUB_LATENCY,
+    STUB_REAL_TIME_FACTOR,
+    STUB_TEXT,
+    TRANSCRIPTION_BACKEND,
+)
+from utils import features as feature_cache
+from utils import profiling
+from utils.metrics import (
+    INFERENCE_AUDIO_SECONDS,
+    INFERENCE_SECONDS,
+    MODEL_LOAD_SECONDS,
+    REAL_TIME_FACTOR,
+)
 
-import torch
-import whisper
+if TYPE_CHECKING:
+    import numpy as np
 
 _MODEL: Any | None = None
+_BACKEND: Optional["Backend"] = None
+_STAGE_HOOKS_INSTALLED = False
+_LOAD_LOCK = threading.Lock()
+_LOAD_THREAD: Optional[threading.Thread] = None
+# Set once loading and warm-up have finished, successfully or not
+_DONE = threading.Event()
+_STATUS: Dict[str, Any] = {
+    "phase": "idle",
+    "error": None,
+    "load_seconds": None,
+    "warmup_seconds": None,
+    "parameter_bytes": None,
+    "max_rss_bytes": None,
+}
+
+# Length of the silent clip used to warm up the model
+WARMUP_SECONDS = 1.0
+
+# Batched decoding falls back like ``whisper.transcribe``, with its defaults:
+# a window whose text is too repetitive or too unlikely is decoded again at
+# the next temperature, and one judged silent yields no text
+DECODE_TEMPERATURES = (0.0, 0.2, 0.4, 0.6, 0.8, 1.0)
+COMPRESSION_RATIO_THRESHOLD = 2.4
+LOGPROB_THRESHOLD = -1.0
+NO_SPEECH_THRESHOLD = 0.6
+
+
+def _max_rss_bytes() -> Optional[int]:
+    try:
+        import resource
+        import sys
+    except ImportError:  # pragma: no cover - not available on Windows
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ``ru_maxrss`` is reported in bytes on macOS and kilobytes elsewhere
+    return rss if sys.platform == "darwin" else rss * 1024
+
+
+class Backend:
+    """Interface implemented by transcription backends."""
+
+    name = ""
+
+    def load(self) -> Any:
+        """Load and return the model object passed to the other methods."""
+        raise NotImplementedError
+
+    def decode(self, audio: Union[str, "np.ndarray"]) -> Any:
+        """Turn a path or in-memory samples into the backend's audio input."""
+        return audio
+
+    def audio_seconds(self, audio: Any) -> float:
+        return len(audio) / 16000
+
+    def transcribe(self, model: Any, audio: Any) -> str:
+        raise NotImplementedError
+
+    def transcribe_batch(self, model: Any, chunks: List[Any]) -> List[str]:
+        """Transcribe chunks of at most one window each, independently."""
+        return [self.transcribe(model, chunk) for chunk in chunks]
+
+    def features(self, audio: Any) -> Optional[Any]:
+        """Return cacheable model input features for decoded ``audio``.
+
+        Features cover the chunks :func:`chunking.split_on_silence` picks and
+        are what :func:`run_model` decodes, so a transcription from cached
+        features matches the first one. ``None`` means the backend has none
+        and callers use :meth:`transcribe_batch`.
+        """
+        return None
+
+    def transcribe_features(self, model: Any, features: Any) -> str:
+        raise NotImplementedError
+
+    def warm_up(self, model: Any) -> None:
+        """Run a throwaway inference so later calls are fast."""
+
+    def parameter_bytes(self, model: Any) -> Optional[int]:
+        return None
+
+
+class WhisperBackend(Backend):
+    """The fine-tuned Whisper ``small.en`` model.
+
+    Whisper's decoder installs KV-cache hooks on the shared model for each
+    decode, so calls into the model are serialized by a lock; with several
+    scheduler workers only audio decoding and feature extraction overlap.
+    """
+
+    name = "whisper"
+
+    def __init__(self) -> None:
+        self._model_lock = threading.Lock()
+
+    def load(self) -> Any:
+        import torch
+        import whisper
+
+        base_model: Any = whisper.load_model("small.en")
+        weights_path = os.path.join(ROOT_DIR, "models", "fine_tuned_whisper_small_en_v4.pth")
+        if not os.path.exists(weights_path):
+            raise FileNotFoundError(weights_path)
+        state_dict = torch.load(weights_path, map_location="cpu")
+        base_model.load_state_dict(state_dict)
+        return base_model
+
+    def decode(self, audio: Union[str, "np.ndarray"]) -> Any:
+        if not isinstance(audio, str):
+            return audio
+        import whisper
+
+        return whisper.load_audio(audio)
+
+    def transcribe(self, model: Any, audio: Any) -> str:
+        with self._model_lock:
+            if profiling.current() is not None:
+                _install_stage_hooks(model)
+            result = model.transcribe(audio)
+        # Return the text component of the result (empty string if missing)
+        return result.get("text", "")
+
+    def transcribe_batch(self, model: Any, chunks: List[Any]) -> List[str]:
+        # One batched decode of the log-mel windows instead of a sequential
+        # ``transcribe`` per chunk; chunks aren't conditioned on each other.
+        return self._decode(model, self._mels(chunks))
+
+    def features(self, audio: Any) -> Optional[Any]:
+        import numpy as np
+        import whisper
+
+        chunks = [audio[start:end] for start, end in chunking.split_on_silence(audio)]
+        # shaped (chunks, mels, frames); frames computed from padding alone
+        # are dropped and restored by :meth:`transcribe_features`
+        hop = whisper.audio.HOP_LENGTH
+        frames = (max(len(chunk) for chunk in chunks) + whisper.audio.N_FFT // 2) // hop + 1
+        mels = self._mels(chunks)[..., : min(frames, whisper.audio.N_FRAMES)]
+        return mels.numpy().astype(np.float16)
+
+    def transcribe_features(self, model: Any, features: Any) -> str:
+        import numpy as np
+        import torch
+        import whisper
+
+        mels = torch.from_numpy(np.asarray(features, dtype=np.float32))
+        missing = whisper.audio.N_FRAMES - mels.shape[-1]
+        if missing > 0:
+            # log-mel normalization clamps silent padding to 2 below each
+            # window's maximum (and -1.5 at the lowest)
+            floor = (mels.amax(dim=(1, 2), keepdim=True) - 2.0).clamp(min=-1.5)
+            mels = torch.cat([mels, floor.expand(-1, mels.shape[1], missing)], dim=-1)
+        texts: List[str] = []
+        for i in range(0, len(mels), CHUNK_BATCH_SIZE):
+            texts.extend(self._decode(model, mels[i : i + CHUNK_BATCH_SIZE]))
+        return chunking.stitch(texts)
+
+    def _mels(self, chunks: List[Any]) -> Any:
+        """Stack the log-mel spectrogram of each chunk padded to 30 s."""
+        import torch
+        import whisper
+
+        return torch.stack(
+            [whisper.log_mel_spectrogram(whisper.pad_or_trim(chunk)) for chunk in chunks]
+        )
+
+    def _decode(self, model: Any, mels: Any) -> List[str]:
+        """Decode a batch of 30 s log-mel windows with temperature fallback."""
+        import whisper
+
+        mels = mels.to(model.device)
+        results: List[Any] = [None] * len(mels)
+        pending = list(range(len(mels)))
+        with self._model_lock:
+            if profiling.current() is not None:
+                _install_stage_hooks(model)
+            for temperature in DECODE_TEMPERATURES:
+                options = whisper.DecodingOptions(
+                    language="en",
+                    without_timestamps=True,
+                    fp16=model.device.type == "cuda",
+                    temperature=temperature,
+                    best_of=5 if temperature > 0 else None,
+                )
+                retry = []
+                for i, result in zip(pending, whisper.decode(model, mels[pending], options)):
+                    results[i] = result
+                    if _needs_fallback(result):
+                        retry.append(i)
+                pending = retry
+                if not pending:
+                    break
+        return ["" if _is_silent(result) else result.text.strip() for result in results]
+
+    def warm_up(self, model: Any) -> None:
+        import numpy as np
+
+        # the same batched decode live transcriptions use
+        self._decode(model, self._mels([np.zeros(int(16000 * WARMUP_SECONDS), dtype=np.float32)]))
+
+    def parameter_bytes(self, model: Any) -> Optional[int]:
+        return sum(p.numel() * p.element_size() for p in model.parameters())
+
+
+def _is_silent(result: Any) -> bool:
+    """Whether a decoding result is likely silence, as ``transcribe`` judges it."""
+    return result.no_speech_prob > NO_SPEECH_THRESHOLD and result.avg_logprob < LOGPROB_THRESHOLD
+
+
+def _needs_fallback(result: Any) -> bool:
+    """Whether a decoding result should be retried at a higher temperature."""
+    if _is_silent(result):
+        return False
+    return (
+        result.compression_ratio > COMPRESSION_RATIO_THRESHOLD
+        or result.avg_logprob < LOGPROB_THRESHOLD
+    )
+
+
+class StubBackend(Backend):
+    """Deterministic stand-in that sleeps instead of running a model.
+
+    Each call takes ``latency`` seconds plus ``real_time_factor`` seconds per
+    second of audio and returns ``text``. Only the standard library is used
+    so load tests run without torch, whisper or numpy.
+    """
+
+    name = "stub"
+
+    def __init__(
+        self,
+        latency: float = STUB_LATENCY,
+        real_time_factor: float = STUB_REAL_TIME_FACTOR,
+        text: str = STUB_TEXT,
+    ) -> None:
+        self.latency = latency
+        self.real_time_factor = real_time_factor
+        self.text = text
+
+    def load(self) -> Any:
+        return self
+
+    def decode(self, audio: Union[str, "np.ndarray"]) -> Any:
+        if not isinstance(audio, str):
+            return audio
+        # only the length matters; read it from the WAV header
+        try:
+            with wave.open(audio, "rb") as wf:
+                return range(int(wf.getnframes() * 16000 / wf.getframerate()))
+        except (OSError, EOFError, wave.Error):
+            return range(0)
+
+    def transcribe(self, model: Any, audio: Any) -> str:
+        time.sleep(self.latency + self.real_time_factor * self.audio_seconds(audio))
+        return self.text
+
+    def transcribe_batch(self, model: Any, chunks: List[Any]) -> List[str]:
+        # a batch costs as much as its longest chunk
+        longest = max((self.audio_seconds(chunk) for chunk in chunks), default=0.0)
+        time.sleep(self.latency + self.real_time_factor * longest)
+        return [self.text] * len(chunks)
+
+    def features(self, audio: Any) -> Optional[Any]:
+        # zeros shaped like Whisper's per-chunk log-mel windows, trimmed to
+        # each chunk's length; caching them needs numpy
+        try:
+            import numpy as np
+        except ImportError:
+            return None
+        chunks = chunking.split_on_silence(audio)
+        longest = max(end - start for start, end in chunks)
+        return np.zeros((len(chunks), 80, max(1, longest // 160)), dtype=np.float16)
+
+    def transcribe_features(self, model: Any, features: Any) -> str:
+        # like :meth:`transcribe_batch`, each batch costs its longest chunk
+        batches = -(-features.shape[0] // CHUNK_BATCH_SIZE)
+        seconds = features.shape[-1] / 100
+        time.sleep(batches * (self.latency + self.real_time_factor * seconds))
+        return self.text
+
+
+BACKENDS = {
+    WhisperBackend.name: WhisperBackend,
+    StubBackend.name: StubBackend,
+}
+
+
+def get_backend() -> Backend:
+    """Return the configured transcription backend."""
+    global _BACKEND
+    if _BACKEND is None:
+        try:
+            _BACKEND = BACKENDS[TRANSCRIPTION_BACKEND]()
+        except KeyError:
+            raise ValueError(f"Unknown transcription backend: {TRANSCRIPTION_BACKEND}") from None
+    return _BACKEND
+
+
+def set_backend(backend: Union[str, Backend]) -> None:
+    """Switch backends, dropping any model loaded by the previous one."""
+    global _BACKEND, _MODEL
+    if isinstance(backend, str):
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown transcription backend: {backend}")
+        backend = BACKENDS[backend]()
+    with _LOAD_LOCK:
+        _BACKEND = backend
+        _MODEL = None
 
 
 def _load_model() -> Any:
-    """Load and cache the fine-tuned Whisper model."""
+    """Load and cache the model for the configured backend."""
     global _MODEL
     if _MODEL is not None:
         return _MODEL
 
-    base_model: Any = whisper.load_model("small.en")
-    weights_path = os.path.join(ROOT_DIR, "models", "fine_tuned_whisper_small_en_v4.pth")
-    if not os.path.exists(weights_path):
-        raise FileNotFoundError(weights_path)
-    state_dict = torch.load(weights_path, map_location="cpu")
-    base_model.load_state_dict(state_dict)
-    _MODEL = base_model
+    with _LOAD_LOCK:
+        if _MODEL is not None:
+            return _MODEL
+        backend = get_backend()
+        _STATUS["phase"] = "loading"
+        _STATUS["backend"] = backend.name
+        start = time.perf_counter()
+        loaded = backend.load()
+        _STATUS["load_seconds"] = round(time.perf_counter() - start, 3)
+        MODEL_LOAD_SECONDS.set(_STATUS["load_seconds"])
+        _STATUS["parameter_bytes"] = backend.parameter_bytes(loaded)
+        _STATUS["max_rss_bytes"] = _max_rss_bytes()
+        _MODEL = loaded
     return _MODEL
 
 
-def run_model(audio_path: str) -> str:
-    """Transcribe ``audio_path`` using a fine-tuned Whisper model.
+def warm_up() -> None:
+    """Load the model and run one inference on silence.
+
+    The first inference pays one-off costs such as kernel selection and
+    allocator growth; running it here keeps them out of user requests.
+    """
+    try:
+        model: Any = _load_model()
+        _STATUS["phase"] = "warming"
+        start = time.perf_counter()
+        get_backend().warm_up(model)
+        _STATUS["warmup_seconds"] = round(time.perf_counter() - start, 3)
+        _STATUS["max_rss_bytes"] = _max_rss_bytes()
+        _STATUS["phase"] = "ready"
+    except Exception as exc:
+        _STATUS["phase"] = "failed"
+        _STATUS["error"] = str(exc)
+    finally:
+        _DONE.set()
+
+
+def set_num_threads(threads: int) -> None:
+    """Limit the number of intra-op threads torch uses in this process."""
+    if get_backend().name != WhisperBackend.name:
+        return
+    import torch
+
+    torch.set_num_threads(max(1, threads))
+
+
+def start_background_load() -> threading.Thread:
+    """Start :func:`warm_up` in a daemon thread if it isn't running yet."""
+    global _LOAD_THREAD
+    if _LOAD_THREAD is None:
+        _LOAD_THREAD = threading.Thread(target=warm_up, name="model-warmup", daemon=True)
+        _LOAD_THREAD.start()
+    return _LOAD_THREAD
+
+
+def wait_until_ready(timeout: Optional[float] = None) -> bool:
+    """Block until background loading finishes.
+
+    Returns ``True`` when the model is ready. If loading was never started
+    this returns immediately so callers fall back to loading on demand.
+    """
+    if _LOAD_THREAD is None:
+        return _MODEL is not None
+    _DONE.wait(timeout)
+    return _STATUS["phase"] == "ready"
+
+
+def status() -> Dict[str, Any]:
+    """Return a snapshot of the model load phase, timings and memory use."""
+    return dict(_STATUS)
+
+
+def _install_stage_hooks(model: Any) -> None:
+    """Time encoder and decoder forward passes for profiling captures.
+
+    Hooks are only installed once a capture is active, so normal inference
+    never pays for them.
+    """
+    global _STAGE_HOOKS_INSTALLED
+    if _STAGE_HOOKS_INSTALLED:
+        return
+    _STAGE_HOOKS_INSTALLED = True
+    local = threading.local()
+
+    for stage in ("encoder", "decoder"):
+
+        def pre_hook(_module: Any, _args: Any, stage: str = stage) -> None:
+            setattr(local, stage, time.perf_counter())
+
+        def post_hook(_module: Any, _args: Any, _output: Any, stage: str = stage) -> None:
+            cap = profiling.current()
+            start = getattr(local, stage, None)
+            if cap is not None and start is not None:
+                cap.add_span(stage, start, time.perf_counter())
+
+        module = getattr(model, stage)
+        module.register_forward_pre_hook(pre_hook)
+        module.register_forward_hook(post_hook)
+
+
+def _ready_model() -> Any:
+    """Return the model once the background warm-up is done with it.
+
+    Whisper's decoder installs forward hooks on the shared modules, so an
+    inference overlapping the warm-up inference would corrupt both.
+    """
+    wait_until_ready()
+    return _load_model()
+
+
+def _chunked(seconds: float) -> bool:
+    # without chunking long audio goes through one sequential ``transcribe``
+    # that conditions each window on the last, which features can't replay
+    return LONG_AUDIO_CHUNKING or seconds <= chunking.MAX_CHUNK_SECONDS
+
+
+def run_model(audio_path: Union[str, "np.ndarray"], signature: Optional[str] = None) -> str:
+    """Transcribe ``audio_path`` with the configured backend.
+
+    The audio is split on silence into chunks of at most one Whisper window,
+    whose features are decoded in batches. Long audio is instead transcribed
+    window by window when :data:`constants.LONG_AUDIO_CHUNKING` is off.
+
+    The features are remembered (see :func:`utils.features.remember`) so
+    storing the audio as a segment caches them without decoding it again.
+
+    Parameters
+    ----------
+    audio_path:
+        Path to the audio file that should be transcribed, or mono float32
+        samples at 16 kHz already decoded in memory.
+    signature:
+        :func:`utils.features.data_signature` of the WAV that in-memory
+        samples were decoded from; features are only remembered for files
+        or samples with a signature.
+
+    Returns
+    -------
+    str
+        The transcribed text.
+    """
+
+    model: Any = _ready_model()
+    backend = get_backend()
+
+    with profiling.profiled("run_model", torch_ops=True):
+        # Decode files ourselves so decoding time is measured separately
+        with profiling.span("decode"):
+            audio = backend.decode(audio_path)
+
+        # Perform transcription on the decoded samples
+        start = time.perf_counter()
+        with profiling.span("inference"):
+            if not _chunked(backend.audio_seconds(audio)):
+                text = backend.transcribe(model, audio)
+            else:
+                with profiling.span("features"):
+                    features = backend.features(audio)
+                if features is None:
+                    text = chunking.transcribe_long(backend, model, audio)
+                else:
+                    if signature is None and isinstance(audio_path, str):
+                        signature = feature_cache.wav_signature(audio_path)
+                    if signature is not None:
+                        feature_cache.remember(signature, features)
+                    text = backend.transcribe_features(model, features)
+        elapsed = time.perf_counter() - start
+    _record_inference(elapsed, backend.audio_seconds(audio))
+    return text
+
+
+def extract_features(audio_path: str) -> Optional[Any]:
+    """Decode ``audio_path`` and return the backend's model input features."""
+    backend = get_backend()
+    with profiling.span("decode"):
+        audio = backend.decode(audio_path)
+    return backend.features(audio)
+
+
+def cache_features(audio_path: str) -> bool:
+    """Store the features for ``audio_path`` ahead of retranscription.
+
+    Features remembered from its first transcription are reused; otherwise
+    they are computed.
+    """
+    if not _chunked(_wav_seconds(audio_path)):
+        return False
+    return feature_cache.cached(audio_path, extract_features) is not None
+
+
+def run_model_cached(audio_path: str) -> str:
+    """Transcribe a stored WAV, reusing its cached features.
+
+    The features are saved next to the WAV (see :mod:`utils.features`),
+    normally from its first transcription by :func:`run_model`, and decoded
+    the same way it decodes them; only decoding the audio and extracting
+    features are skipped. Backends without features, and long audio while
+    :data:`constants.LONG_AUDIO_CHUNKING` is off, fall back to
+    :func:`run_model`.
 
     Parameters
     ----------
     audio_path:
-        Path to the audio file that should be transcribed.
+        Path to a WAV file that is kept, e.g. a discussion segment.
 
     Returns
     -------
@@ -41,10 +564,34 @@ def run_model(audio_path: str) -> str:
         The transcribed text.
     """
 
-    model: Any = _load_model()
+    if not _chunked(_wav_seconds(audio_path)):
+        return run_model(audio_path)
+    model: Any = _ready_model()
+    backend = get_backend()
+    with profiling.span("features"):
+        features = feature_cache.cached(audio_path, extract_features)
+    if features is None:
+        return run_model(audio_path)
+
+    with profiling.profiled("run_model", torch_ops=True):
+        start = time.perf_counter()
+        with profiling.span("inference"):
+            text = backend.transcribe_features(model, features)
+        elapsed = time.perf_counter() - start
+    _record_inference(elapsed, _wav_seconds(audio_path))
+    return text
+
+
+def _wav_seconds(path: str) -> float:
+    try:
+        with wave.open(path, "rb") as wf:
+            return wf.getnframes() / wf.getframerate()
+    except (OSError, EOFError, wave.Error):
+        return 0.0
 
-    # Perform transcription on the given audio file
-    result = model.transcribe(audio_path)
 
-    # Return the text component of the result (empty string if missing)
-    return result.get("text", "")
+def _record_inference(elapsed: float, audio_seconds: float) -> None:
+    INFERENCE_SECONDS.observe(elapsed)
+    if audio_seconds:
+        INFERENCE_AUDIO_SECONDS.inc(audio_seconds)
+        REAL_TIME_FACTOR.observe(elapsed / audio_seconds)
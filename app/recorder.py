@@ -2,20 +2,28 @@ import os
 import queue
 import wave
 from datetime import datetime
-from typing import Optional
-
-import numpy as np
-import sounddevice as sd
+from typing import TYPE_CHECKING, Optional
 
+import retention
 from constants import RECORDING_DIR, SAMPLE_RATE, TIMESTAMP_FORMAT
 
+if TYPE_CHECKING:
+    import numpy as np
+    import sounddevice as sd
+
 
 class Recorder:
-    """Handle audio recording using sounddevice."""
+    """Handle audio recording using sounddevice.
+
+    ``numpy`` and ``sounddevice`` are imported on first use so creating a
+    recorder doesn't slow down application startup. Recordings are saved in
+    ``directory``.
+    """
 
-    def __init__(self) -> None:
-        self.audio_queue: queue.Queue[np.ndarray] = queue.Queue()
-        self.stream: Optional[sd.InputStream] = None
+    def __init__(self, directory: str = RECORDING_DIR) -> None:
+        self.directory = directory
+        self.audio_queue: "queue.Queue[np.ndarray]" = queue.Queue()
+        self.stream: Optional["sd.InputStream"] = None
         self.recording = False
         self.last_timestamp: Optional[str] = None
 
@@ -31,6 +39,8 @@ class Recorder:
         # create a new queue to avoid thread-safety issues
         self.audio_queue = queue.Queue()
         try:
+            import sounddevice as sd
+
             self.stream = sd.InputStream(
                 samplerate=SAMPLE_RATE,
                 channels=1,
@@ -67,14 +77,18 @@ class Recorder:
         self.recording = False
         if not frames:
             return None
+        import numpy as np
+
         audio = np.concatenate(frames, axis=0)
         audio = np.int16(audio * 32767)
         timestamp = datetime.now().strftime(TIMESTAMP_FORMAT)
         self.last_timestamp = timestamp
-        file_path = os.path.join(RECORDING_DIR, f"RECORDING_{timestamp}.wav")
+        os.makedirs(self.directory, exist_ok=True)
+        file_path = os.path.join(self.directory, f"RECORDING_{timestamp}.wav")
         with wave.open(file_path, "wb") as wf:
             wf.setnchannels(1)
             wf.setsampwidth(2)
             wf.setframerate(SAMPLE_RATE)
             wf.writeframes(audio.tobytes())
+        retention.get_index().add(file_path)
         return file_path
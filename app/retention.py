@@ -0,0 +1,249 @@
+"""Retention of raw recordings left behind in :data:`RECORDING_DIR`.
+
+Successful transcriptions move their recording into a discussion, so any
+file still in the recordings folder is orphaned, e.g. because transcription
+failed or produced no text. :class:`RetentionManager` deletes (or archives)
+such files once they exceed the configured age, and the oldest ones while
+the folder is over its size limit.
+
+:class:`RecordingIndex` remembers the recordings the app has written so
+"latest recording" lookups don't list and sort the whole folder.
+"""
+
+import argparse
+import logging
+import os
+import shutil
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from constants import (
+    RECORDING_ARCHIVE_DIR,
+    RECORDING_DIR,
+    RECORDING_MAX_AGE,
+    RECORDING_MAX_BYTES,
+)
+
+logger = logging.getLogger(__name__)
+
+# Recordings younger than this are never removed; they may still be queued
+# for transcription
+RECORDING_GRACE_SECONDS = 10 * 60
+# Seconds between background sweeps
+RETENTION_SWEEP_INTERVAL = 10 * 60
+
+
+class RecordingIndex:
+    """Modification time and size of each recording in ``directory``.
+
+    The folder and its subfolders (one per API session) are listed once, on
+    first use, to pick up files from earlier runs; afterwards the recorder
+    registers new files with :meth:`add`.
+    """
+
+    def __init__(self, directory: str = RECORDING_DIR) -> None:
+        self.directory = directory
+        self._entries: Dict[str, Tuple[float, int]] = {}
+        self._scanned = False
+        self._lock = threading.Lock()
+
+    def _scan(self) -> None:
+        if self._scanned:
+            return
+        self._scanned = True
+        for root, _, names in os.walk(self.directory):
+            for name in names:
+                if name.lower().endswith(".wav"):
+                    self._stat(os.path.join(root, name))
+
+    def _stat(self, path: str) -> None:
+        try:
+            st = os.stat(path)
+        except OSError:
+            self._entries.pop(path, None)
+            return
+        self._entries[path] = (st.st_mtime, st.st_size)
+
+    def add(self, path: str) -> None:
+        with self._lock:
+            self._scan()
+            self._stat(path)
+
+    def discard(self, path: str) -> None:
+        with self._lock:
+            self._entries.pop(path, None)
+
+    def entries(self) -> List[Tuple[str, float, int]]:
+        """Return ``(path, mtime, size)`` for each recording, oldest first.
+
+        Files moved away since they were indexed (for example into a
+        discussion) are dropped.
+        """
+        with self._lock:
+            self._scan()
+            for path in [p for p in self._entries if not os.path.exists(p)]:
+                del self._entries[path]
+            return sorted(
+                ((path, mtime, size) for path, (mtime, size) in self._entries.items()),
+                key=lambda e: (e[1], e[0]),
+            )
+
+    def latest(self) -> Optional[str]:
+        """Return the newest recording still in the folder."""
+        with self._lock:
+            self._scan()
+            for path, _ in sorted(self._entries.items(), key=lambda e: (e[1][0], e[0]), reverse=True):
+                if os.path.exists(path):
+                    return path
+                del self._entries[path]
+        return None
+
+
+class RetentionManager:
+    """Enforce age and size limits on the recordings in an index."""
+
+    def __init__(
+        self,
+        index: RecordingIndex,
+        max_age: float = RECORDING_MAX_AGE,
+        max_bytes: int = RECORDING_MAX_BYTES,
+        archive_dir: Optional[str] = RECORDING_ARCHIVE_DIR or None,
+        grace: float = RECORDING_GRACE_SECONDS,
+    ) -> None:
+        self.index = index
+        self.max_age = max_age
+        self.max_bytes = max_bytes
+        self.archive_dir = archive_dir
+        self.grace = grace
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def expired(self, now: Optional[float] = None) -> List[Tuple[str, float, int]]:
+        """Return the recordings a sweep at ``now`` would remove."""
+        now = time.time() if now is None else now
+        entries = self.index.entries()
+        total = sum(size for _, _, size in entries)
+        selected = []
+        for path, mtime, size in entries:
+            age = now - mtime
+            if age < self.grace:
+                break  # the rest are newer still
+            if age > self.max_age or total > self.max_bytes:
+                selected.append((path, mtime, size))
+                total -= size
+        return selected
+
+    def sweep(self, now: Optional[float] = None, dry_run: bool = False) -> Dict[str, Any]:
+        """Delete or archive expired recordings and report what was reclaimed."""
+        before = sum(size for _, _, size in self.index.entries())
+        removed = archived = reclaimed = 0
+        for path, _, size in self.expired(now):
+            if not dry_run:
+                try:
+                    if self.archive_dir:
+                        os.makedirs(self.archive_dir, exist_ok=True)
+                        shutil.move(path, os.path.join(self.archive_dir, os.path.basename(path)))
+                    else:
+                        os.remove(path)
+                except FileNotFoundError:
+                    # moved into a discussion meanwhile
+                    self.index.discard(path)
+                    continue
+                except OSError as exc:
+                    logger.warning("Couldn't remove recording %s: %s", path, exc)
+                    continue
+                self.index.discard(path)
+            if self.archive_dir:
+                archived += 1
+            else:
+                removed += 1
+            reclaimed += size
+        return {
+            "removed": removed,
+            "archived": archived,
+            "reclaimed_bytes": reclaimed,
+            "remaining_bytes": before - reclaimed,
+        }
+
+    def start(self, interval: float = RETENTION_SWEEP_INTERVAL) -> threading.Thread:
+        """Sweep now and then every ``interval`` seconds in a daemon thread."""
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(
+                target=self._run, args=(interval,), name="recording-retention", daemon=True
+            )
+            self._thread.start()
+        return self._thread
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self, interval: float) -> None:
+        while True:
+            try:
+                report = self.sweep()
+            except Exception:
+                logger.exception("Recording retention sweep failed")
+            else:
+                if report["reclaimed_bytes"]:
+                    logger.info(
+                        "Reclaimed %d bytes from %d old recording(s)",
+                        report["reclaimed_bytes"],
+                        report["removed"] + report["archived"],
+                    )
+            if self._stop.wait(interval):
+                return
+
+
+_INDEX: Optional[RecordingIndex] = None
+_MANAGER: Optional[RetentionManager] = None
+_LOCK = threading.Lock()
+
+
+def get_index() -> RecordingIndex:
+    """Return the process-wide index of :data:`RECORDING_DIR`."""
+    global _INDEX
+    with _LOCK:
+        if _INDEX is None:
+            _INDEX = RecordingIndex()
+    return _INDEX
+
+
+def start_background_sweep() -> RetentionManager:
+    """Start the process-wide retention manager if it isn't running yet."""
+    global _MANAGER
+    index = get_index()
+    with _LOCK:
+        if _MANAGER is None:
+            _MANAGER = RetentionManager(index)
+            _MANAGER.start()
+    return _MANAGER
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Remove old recordings from the recordings folder")
+    parser.add_argument("--max-age-hours", type=float, default=RECORDING_MAX_AGE / 3600)
+    parser.add_argument("--max-mb", type=float, default=RECORDING_MAX_BYTES / 1024 / 1024)
+    parser.add_argument("--archive", default=RECORDING_ARCHIVE_DIR or None, help="move files here instead")
+    parser.add_argument("--dry-run", action="store_true", help="only report what would be removed")
+    args = parser.parse_args()
+    manager = RetentionManager(
+        RecordingIndex(),
+        max_age=args.max_age_hours * 3600,
+        max_bytes=int(args.max_mb * 1024 * 1024),
+        archive_dir=args.archive,
+    )
+    report = manager.sweep(dry_run=args.dry_run)
+    verb = "Would reclaim" if args.dry_run else "Reclaimed"
+    print(
+        f"{verb} {report['reclaimed_bytes']} bytes from "
+        f"{report['removed'] + report['archived']} recording(s)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""Priority scheduler shared by every transcription in the process.
+
+Both the desktop UI and the API server submit work here instead of starting
+threads or calling :func:`model.run_model` inline. A fixed number of worker
+threads run jobs in priority order, so live recordings are not stuck behind
+re-transcriptions or bulk reprocessing.
+"""
+
+import contextvars
+import heapq
+import itertools
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from constants import SCHEDULER_WORKERS
+from utils.metrics import QUEUE_DEPTH
+
+# Job priorities; lower runs first
+LIVE = 0
+RETRANSCRIBE = 1
+BULK = 2
+
+PRIORITIES = {"live": LIVE, "retranscribe": RETRANSCRIBE, "bulk": BULK}
+
+
+class Superseded(Exception):
+    """Set on a job's future when a newer job with the same key replaces it."""
+
+
+class _Job:
+    __slots__ = ("func", "args", "kwargs", "future", "key", "context")
+
+    def __init__(self, func: Callable[..., Any], args: tuple, kwargs: dict, key: Optional[str]) -> None:
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.future: Future = Future()
+        self.key = key
+        # run with the submitter's context so profiling captures follow the job
+        self.context = contextvars.copy_context()
+
+
+class TranscriptionScheduler:
+    """Run submitted callables on ``workers`` threads in priority order."""
+
+    def __init__(self, workers: int = SCHEDULER_WORKERS) -> None:
+        self.workers = max(1, workers)
+        self._queue: List[Tuple[int, int, _Job]] = []
+        self._keys: Dict[str, _Job] = {}
+        self._counter = itertools.count()
+        self._cond = threading.Condition()
+        self._threads: List[threading.Thread] = []
+        self._shutdown = False
+
+    def submit(
+        self,
+        func: Callable[..., Any],
+        *args: Any,
+        priority: int = LIVE,
+        key: Optional[str] = None,
+        **kwargs: Any,
+    ) -> Future:
+        """Queue ``func(*args, **kwargs)`` and return a future for its result.
+
+        A pending job submitted earlier with the same ``key`` is superseded:
+        it never runs and its future raises :class:`Superseded`.
+        """
+        job = _Job(func, args, kwargs, key)
+        with self._cond:
+            if self._shutdown:
+                raise RuntimeError("scheduler is shut down")
+            if key is not None:
+                previous = self._keys.get(key)
+                if previous is not None and not previous.future.done():
+                    previous.future.set_exception(Superseded(key))
+                self._keys[key] = job
+            heapq.heappush(self._queue, (priority, next(self._counter), job))
+            QUEUE_DEPTH.inc()
+            self._start_workers()
+            self._cond.notify()
+        return job.future
+
+    def cancel(self, key: str) -> bool:
+        """Cancel the pending job registered under ``key``."""
+        with self._cond:
+            job = self._keys.pop(key, None)
+            return job is not None and job.future.cancel()
+
+    def pending(self) -> int:
+        with self._cond:
+            return sum(1 for _, _, job in self._queue if not job.future.done())
+
+    def shutdown(self, wait: bool = True) -> None:
+        with self._cond:
+            self._shutdown = True
+            self._cond.notify_all()
+        if wait:
+            for thread in self._threads:
+                thread.join()
+
+    def _start_workers(self) -> None:
+        # Threads start lazily so forked server workers get their own
+        while len(self._threads) < self.workers:
+            thread = threading.Thread(
+                target=self._work, name=f"transcription-{len(self._threads)}", daemon=True
+            )
+            self._threads.append(thread)
+            thread.start()
+
+    def _next_job(self) -> Optional[_Job]:
+        with self._cond:
+            while True:
+                while self._queue:
+                    _, _, job = heapq.heappop(self._queue)
+                    if job.key is not None and self._keys.get(job.key) is job:
+                        del self._keys[job.key]
+                    # superseded jobs are already done; cancelled ones are
+                    # caught here, whoever cancelled them
+                    if not job.future.done() and job.future.set_running_or_notify_cancel():
+                        return job
+                    QUEUE_DEPTH.dec()
+                if self._shutdown:
+                    return None
+                self._cond.wait()
+
+    def _work(self) -> None:
+        while True:
+            job = self._next_job()
+            if job is None:
+                return
+            try:
+                result = job.context.run(job.func, *job.args, **job.kwargs)
+            except BaseException as exc:
+                job.future.set_exception(exc)
+            else:
+                job.future.set_result(result)
+            finally:
+                QUEUE_DEPTH.dec()
+
+
+_SCHEDULER: Optional[TranscriptionScheduler] = None
+_SCHEDULER_LOCK = threading.Lock()
+
+
+def get_scheduler() -> TranscriptionScheduler:
+    """Return the process-wide scheduler."""
+    global _SCHEDULER
+    if _SCHEDULER is None:
+        with _SCHEDULER_LOCK:
+            if _SCHEDULER is None:
+                _SCHEDULER = TranscriptionScheduler()
+    return _SCHEDULER
@@ -1,25 +1,72 @@
 from __future__ import annotations
 
+import argparse
+import asyncio
 import os
 import logging
+import time
+from contextlib import asynccontextmanager
+from functools import partial
 
 try:
     import fastapi
-    from fastapi import FastAPI, HTTPException, Request
+    from fastapi import Depends, FastAPI, HTTPException, Request
+    from fastapi.concurrency import run_in_threadpool
     from fastapi.middleware.cors import CORSMiddleware
+    from fastapi.responses import JSONResponse, PlainTextResponse
     print("fastapi", fastapi.__version__)
 except Exception as exc:  # pragma: no cover - startup check
     raise SystemExit(f"Couldn't import fastapi: {exc}") from exc
 
-from recorder import Recorder
+import model
+import retention
 from model import run_model
-from constants import RECORDING_DIR, DISCUSSIONS_DIR
-from storage import TranscriptStorage
+from constants import DISCUSSIONS_DIR, SAMPLE_RATE
+from scheduler import BULK, LIVE, PRIORITIES, RETRANSCRIBE, Superseded, get_scheduler
+from sessions import Session, SessionManager
+from storage import DiscussionStorage
+from utils import features as feature_cache, profiling
+from utils.metrics import HTTP_LATENCY, HTTP_REQUESTS, render as render_metrics
+from utils.pcm import decode_wav_bytes, upload_to_wav_bytes
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-app = FastAPI()
+# Seconds a request waits for the background model load before giving up
+READY_TIMEOUT = 300.0
+
+# Largest accepted upload body (about 10 minutes of 44.1 kHz mono PCM)
+MAX_UPLOAD_BYTES = 64 * 1024 * 1024
+
+# Clients identify their session with this header or a ``session`` query param
+SESSION_HEADER = "X-ClearSay-Session"
+# Seconds between sweeps for idle sessions
+SESSION_SWEEP_INTERVAL = 60.0
+
+sessions = SessionManager()
+
+
+async def _evict_idle_sessions() -> None:
+    while True:
+        await asyncio.sleep(SESSION_SWEEP_INTERVAL)
+        for session_id in sessions.evict_idle():
+            logger.info("Evicted idle session %s", session_id)
+
+
+@asynccontextmanager
+async def lifespan(_app: FastAPI):
+    """Load and warm up the model in the background while serving requests.
+
+    Old recordings are cleaned up by a background retention sweep.
+    """
+    model.start_background_load()
+    retention.start_background_sweep()
+    sweeper = asyncio.create_task(_evict_idle_sessions())
+    yield
+    sweeper.cancel()
+
+
+app = FastAPI(lifespan=lifespan)
 
 # Allow the Electron UI to make requests
 app.add_middleware(
@@ -29,17 +76,65 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-recorder = Recorder()
-transcript_buffer = TranscriptStorage()
+
+@app.middleware("http")
+async def record_metrics(request: Request, call_next):
+    """Count requests and record their latency per route."""
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        route = getattr(request.scope.get("route"), "path", "unmatched")
+        HTTP_LATENCY.observe(time.perf_counter() - start, route=route)
+        HTTP_REQUESTS.inc(route=route, method=request.method, status=str(status))
+
+
+async def _transcribe_when_ready(
+    audio, priority: int = LIVE, key: str | None = None, func=run_model
+):
+    """Schedule the model once background loading is done.
+
+    All sessions share the one loaded model through the process scheduler;
+    a job superseded by a newer one with the same ``key`` raises 409.
+    """
+    if not await run_in_threadpool(model.wait_until_ready, READY_TIMEOUT):
+        logger.warning("Model not ready (%s), loading on demand", model.status()["phase"])
+    future = get_scheduler().submit(func, audio, priority=priority, key=key)
+    try:
+        return await asyncio.wrap_future(future)
+    except Superseded as exc:
+        raise HTTPException(status_code=409, detail="Superseded by a newer request") from exc
+
+
+def get_session(request: Request) -> Session:
+    """Return the caller's session, creating it on first use."""
+    session_id = request.headers.get(SESSION_HEADER) or request.query_params.get("session")
+    return sessions.get(session_id)
+
+
+def _persist(session: Session, func, *args):
+    with session.synced():
+        return func(*args)
+
+
+def _cache_features(wav_path: str | None) -> None:
+    # stores the features remembered by run_model, so retranscribing the new
+    # segment skips decoding it
+    if wav_path is not None:
+        get_scheduler().submit(model.cache_features, wav_path, priority=BULK)
 
 
 @app.post("/record")
-async def record(request: Request):
+async def record(request: Request, session: Session = Depends(get_session)):
     """Start or stop recording based on the ``action`` field."""
     data = await request.json()
     action = data.get("action")
+    recorder = session.recorder
     if action == "start":
-        logger.info("Starting recording")
+        logger.info("Starting recording for session %s", session.id)
         recorder.start()
         return {"status": "recording"}
     if action == "stop":
@@ -57,50 +152,287 @@ async def health() -> dict[str, str]:
     return {"status": "ok"}
 
 
+@app.get("/ready")
+async def ready():
+    """Report model load phase, timings and memory footprint."""
+    info = model.status()
+    code = 200 if info["phase"] == "ready" else 503
+    return JSONResponse(info, status_code=code)
+
+
+@app.get("/metrics")
+async def metrics():
+    """Expose request, inference and storage metrics for Prometheus."""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/profile")
+async def profile_status():
+    """Return how many profiling captures are armed and recent outputs."""
+    return profiling.status()
+
+
+@app.post("/profile")
+async def arm_profile(request: Request):
+    """Profile the next ``count`` transcriptions."""
+    data = await request.json()
+    try:
+        count = int(data.get("count", 1))
+    except (TypeError, ValueError) as exc:
+        raise HTTPException(status_code=400, detail="Invalid count") from exc
+    profiling.arm(count)
+    return profiling.status()
+
+
 @app.get("/transcribe")
-async def transcribe(file: str):
-    """Transcribe ``file`` from ``recorded_audio`` or ``discussions``."""
-    path = os.path.abspath(os.path.join(RECORDING_DIR, file))
-    recording_root = os.path.abspath(RECORDING_DIR)
+async def transcribe(file: str, session: Session = Depends(get_session)):
+    """Transcribe ``file`` from the session's recordings or ``discussions``."""
+    recording_root = os.path.abspath(session.recorder.directory)
+    path = os.path.abspath(os.path.join(recording_root, file))
     valid = path.startswith(recording_root + os.sep) and os.path.exists(path)
+    priority, func = LIVE, run_model
+    discussion = None
     if not valid:
+        # stored segments reuse their cached features
+        priority, func = RETRANSCRIBE, model.run_model_cached
         path = os.path.abspath(os.path.join(DISCUSSIONS_DIR, file))
         disc_root = os.path.abspath(DISCUSSIONS_DIR)
         valid = path.startswith(disc_root + os.sep) and os.path.exists(path)
-        if valid and transcript_buffer.current_id is None:
-            transcript_buffer.resume_last_discussion()
+        if valid:
+            # a segment is updated in its own discussion, never moved into
+            # the caller's
+            discussion = DiscussionStorage()
+            valid = (
+                discussion.open_discussion(os.path.relpath(path, disc_root).split(os.sep)[0])
+                and discussion.find_segment(path) is not None
+            )
     logger.info("Transcribe request for %s", path)
     if not valid:
         logger.warning("File not found or outside allowed dirs: %s", file)
         raise HTTPException(status_code=404, detail="File not found")
-    try:
-        text = run_model(path)
-    except Exception as exc:  # broad but ensures we never crash
-        logger.exception("run_model failed for %s", path)
-        raise HTTPException(status_code=500, detail="Transcription failed") from exc
+    with profiling.capture("transcribe"):
+        try:
+            text = await _transcribe_when_ready(
+                path, priority, key=f"{session.id}:{path}", func=func
+            )
+        except HTTPException:
+            raise
+        except Exception as exc:  # broad but ensures we never crash
+            logger.exception("run_model failed for %s", path)
+            raise HTTPException(status_code=500, detail="Transcription failed") from exc
+
+        def store() -> str | None:
+            if not text or not session.storage.append(text, path):
+                return None
+            # read the new entry while the session is still locked
+            storage = session.storage
+            return os.path.join(storage.discussion_path, storage.segments[-1]["wav"])
 
-    transcript_buffer.append(text, path)
+        def update() -> bool:
+            # a session without a discussion continues in the segment's one
+            if session.storage.current_id is None:
+                session.storage.open_discussion(os.path.basename(discussion.discussion_path))
+            return discussion.update_segment(text, path)
+
+        if discussion is None:
+            _cache_features(await run_in_threadpool(_persist, session, store))
+        elif not await run_in_threadpool(_persist, session, update):
+            raise HTTPException(status_code=409, detail="Segment was removed")
     return {"transcript": text}
 
 
+@app.post("/transcribe_upload")
+async def transcribe_upload(
+    request: Request,
+    sample_rate: int = SAMPLE_RATE,
+    channels: int = 1,
+    persist: bool = False,
+    priority: str = "live",
+    session: Session = Depends(get_session),
+):
+    """Transcribe audio sent as the request body.
+
+    The body is either a WAV file or raw little-endian 16-bit PCM described
+    by ``sample_rate`` and ``channels``. Audio is decoded in memory; with
+    ``persist`` it is also stored as a segment of the current discussion.
+    ``priority`` is ``live``, ``retranscribe`` or ``bulk``; batch tools should
+    use ``bulk`` so they don't delay interactive requests.
+    """
+    if priority not in PRIORITIES:
+        raise HTTPException(status_code=400, detail="Invalid priority")
+    body = bytearray()
+    async for chunk in request.stream():
+        body.extend(chunk)
+        if len(body) > MAX_UPLOAD_BYTES:
+            raise HTTPException(status_code=413, detail="Upload too large")
+    if not body:
+        raise HTTPException(status_code=400, detail="No audio uploaded")
+    try:
+        wav_data = upload_to_wav_bytes(body, sample_rate, channels)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail="Invalid PCM format") from exc
+    del body
+    try:
+        audio = decode_wav_bytes(wav_data)
+    except Exception as exc:
+        raise HTTPException(status_code=400, detail="Unsupported audio") from exc
+    logger.info("Transcribe upload of %.1fs audio", len(audio) / 16000)
+
+    with profiling.capture("transcribe_upload"):
+        try:
+            # the stored WAV holds ``wav_data``, so its features are found
+            # by the signature of the file
+            func = run_model
+            if persist:
+                func = partial(run_model, signature=feature_cache.data_signature(wav_data))
+            text = await _transcribe_when_ready(audio, PRIORITIES[priority], func=func)
+        except HTTPException:
+            raise
+        except Exception as exc:  # broad but ensures we never crash
+            logger.exception("run_model failed for upload")
+            raise HTTPException(status_code=500, detail="Transcription failed") from exc
+
+        discussion = segment = None
+        if persist and text:
+
+            def store() -> tuple[str | None, str, str]:
+                # read the new entry while the session is still locked
+                session.storage.add_segment_data(text, wav_data)
+                segment = session.storage.segments[-1]["wav"]
+                return (
+                    session.storage.current_id,
+                    segment,
+                    os.path.join(session.storage.discussion_path, segment),
+                )
+
+            discussion, segment, wav_path = await run_in_threadpool(_persist, session, store)
+            _cache_features(wav_path)
+    return {"transcript": text, "discussion": discussion, "segment": segment}
+
+
 @app.get("/current_discussion")
-async def current_discussion() -> dict[str, str | None]:
+async def current_discussion(session: Session = Depends(get_session)) -> dict[str, str | None]:
     """Return the currently active discussion ID and name, if any."""
-    return {"id": transcript_buffer.current_id, "name": transcript_buffer.name}
+    return await run_in_threadpool(
+        _persist, session, lambda: {"id": session.storage.current_id, "name": session.storage.name}
+    )
 
 
 @app.post("/discussion_name")
-async def set_discussion_name(request: Request):
+async def set_discussion_name(request: Request, session: Session = Depends(get_session)):
     """Set a user friendly name for the current discussion."""
     data = await request.json()
     name = data.get("name")
-    if transcript_buffer.current_id is None:
+
+    def rename() -> bool:
+        if session.storage.current_id is None:
+            return False
+        session.storage.set_name(name)
+        return True
+
+    if not await run_in_threadpool(_persist, session, rename):
         raise HTTPException(status_code=400, detail="No active discussion")
-    transcript_buffer.set_name(name)
     return {"status": "ok"}
 
 
+@app.get("/discussions/{name}/segments")
+async def discussion_segments(
+    name: str, peaks: bool = True, session: Session = Depends(get_session)
+):
+    """Return segment metadata for ``name`` including waveform peaks."""
+    disc_root = os.path.abspath(DISCUSSIONS_DIR)
+    path = os.path.abspath(os.path.join(DISCUSSIONS_DIR, name))
+    if not path.startswith(disc_root + os.sep):
+        raise HTTPException(status_code=404, detail="Discussion not found")
+    segments = session.storage.load_segments(name, with_peaks=peaks)
+    if segments is None:
+        raise HTTPException(status_code=404, detail="Discussion not found")
+    return {"id": name, "segments": segments}
+
+
+def _serve_prefork(workers: int, host: str, port: int) -> None:
+    """Load the model once, then fork ``workers`` uvicorn processes.
+
+    Workers inherit the weights copy-on-write from the parent so total memory
+    stays close to a single model. The parent supervises the workers and
+    restarts any that exit unexpectedly.
+    """
+    import gc
+    import signal
+    import socket
+
+    import uvicorn
+
+    # Keep the parent single-threaded while loading: torch's OpenMP pool
+    # does not survive ``fork`` and can deadlock children that inherit it.
+    model.set_num_threads(1)
+    model._load_model()
+    # Move everything allocated so far out of the collector's reach so GC
+    # passes in the workers don't write to (and un-share) those pages.
+    gc.collect()
+    gc.freeze()
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    threads = max(1, (os.cpu_count() or 1) // workers)
+    children: set[int] = set()
+    stopping = False
+
+    def spawn() -> None:
+        pid = os.fork()
+        if pid == 0:
+            code = 0
+            try:
+                model.set_num_threads(threads)
+                config = uvicorn.Config(app, host=host, port=port)
+                uvicorn.Server(config).run(sockets=[sock])
+            except Exception:
+                logger.exception("Worker %d failed", os.getpid())
+                code = 1
+            finally:
+                os._exit(code)
+        logger.info("Started worker %d", pid)
+        children.add(pid)
+
+    def stop(_signum, _frame) -> None:
+        nonlocal stopping
+        stopping = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    for _ in range(workers):
+        spawn()
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    while children:
+        try:
+            pid, _status = os.wait()
+        except ChildProcessError:
+            break
+        children.discard(pid)
+        if not stopping:
+            logger.warning("Worker %d exited, restarting", pid)
+            spawn()
+    sock.close()
+
+
 def main() -> None:
+    parser = argparse.ArgumentParser(description="ClearSay API server")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=int(os.environ.get("CLEARSAY_WORKERS", "1")),
+        help="number of pre-forked worker processes sharing one model copy",
+    )
+    args = parser.parse_args()
+
     try:
         import uvicorn
     except Exception as exc:  # pragma: no cover - startup check
@@ -108,7 +440,12 @@ def main() -> None:
         raise SystemExit(1) from exc
 
     try:
-        uvicorn.run("server:app", host="127.0.0.1", port=8000)
+        if args.workers > 1:
+            if not hasattr(os, "fork"):
+                raise SystemExit("--workers requires a platform with fork()")
+            _serve_prefork(args.workers, "127.0.0.1", 8000)
+        else:
+            uvicorn.run("server:app", host="127.0.0.1", port=8000)
     except Exception as exc:
         logger.error("Failed to launch Uvicorn: %s", exc)
         raise
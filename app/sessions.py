@@ -0,0 +1,113 @@
+"""Per-client state for the API server.
+
+Each session owns its own :class:`Recorder` and :class:`DiscussionStorage`
+so several clients can record into separate discussions at once.
+
+Pre-forked server workers each hold their own :class:`Session` objects, so
+the id of a session's current discussion is also kept in a small file under
+:data:`SESSIONS_DIR`; :meth:`Session.synced` makes every worker use it.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
+
+from constants import RECORDING_DIR, SESSIONS_DIR
+from recorder import Recorder
+from storage import DiscussionStorage
+from utils.fileio import atomic_write, file_lock
+
+# Session used by clients that don't send an id (e.g. the Electron UI)
+DEFAULT_SESSION = "default"
+
+# Sessions unused for this many seconds are dropped
+SESSION_IDLE_TIMEOUT = 30 * 60
+
+
+class Session:
+    """Recorder, discussion storage and lock belonging to one client."""
+
+    def __init__(
+        self, session_id: str, state_dir: str = SESSIONS_DIR, recording_dir: str = RECORDING_DIR
+    ) -> None:
+        self.id = session_id
+        # client-chosen ids are hashed so they can't escape the folders below
+        digest = hashlib.blake2b(session_id.encode("utf-8"), digest_size=16).hexdigest()
+        # each session records into, and may only transcribe from, its own folder
+        self.recorder = Recorder(os.path.join(recording_dir, digest))
+        self.storage = DiscussionStorage()
+        # Serializes storage updates made by concurrent requests
+        self.lock = threading.Lock()
+        self.last_used = time.monotonic()
+        self.state_path = os.path.join(state_dir, f"{digest}.json")
+
+    def touch(self) -> None:
+        self.last_used = time.monotonic()
+
+    def busy(self) -> bool:
+        return self.recorder.recording or self.lock.locked()
+
+    def _read_discussion(self) -> Optional[str]:
+        try:
+            with open(self.state_path, "r", encoding="utf-8") as f:
+                return json.load(f).get("discussion")
+        except (OSError, ValueError):
+            return None
+
+    @contextmanager
+    def synced(self) -> Iterator[None]:
+        """Lock the session in every worker and use its shared discussion.
+
+        On entry the storage switches to the discussion other workers last
+        recorded for this session; on exit the current one is recorded.
+        """
+        os.makedirs(os.path.dirname(self.state_path), exist_ok=True)
+        with self.lock, file_lock(self.state_path + ".lock"):
+            shared = self._read_discussion()
+            if shared and shared != self.storage.current_id:
+                self.storage.open_discussion(shared)
+            yield
+            if self.storage.current_id != shared:
+                atomic_write(self.state_path, json.dumps({"discussion": self.storage.current_id}))
+
+
+class SessionManager:
+    """Create sessions on first use and evict idle ones."""
+
+    def __init__(self, idle_timeout: float = SESSION_IDLE_TIMEOUT, state_dir: str = SESSIONS_DIR) -> None:
+        self.idle_timeout = idle_timeout
+        self.state_dir = state_dir
+        self._sessions: Dict[str, Session] = {}
+        self._lock = threading.Lock()
+
+    def get(self, session_id: Optional[str] = None) -> Session:
+        """Return the session for ``session_id``, creating it if needed."""
+        session_id = session_id or DEFAULT_SESSION
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                session = Session(session_id, self.state_dir)
+                self._sessions[session_id] = session
+        session.touch()
+        return session
+
+    def evict_idle(self) -> List[str]:
+        """Drop sessions idle for longer than ``idle_timeout``.
+
+        Sessions that are recording or mid-update are kept.
+        """
+        cutoff = time.monotonic() - self.idle_timeout
+        evicted = []
+        with self._lock:
+            for session_id, session in list(self._sessions.items()):
+                if session.last_used < cutoff and not session.busy():
+                    del self._sessions[session_id]
+                    evicted.append(session_id)
+        return evicted
+
+    def __len__(self) -> int:
+        return len(self._sessions)
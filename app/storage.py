@@ -1,19 +1,34 @@
+import io
 import json
 import os
 import shutil
+import wave
+from contextlib import contextmanager
 from datetime import datetime
-from typing import Dict, List, Optional, Callable
+from typing import Any, Dict, Iterator, List, Optional, Callable, Tuple
 
-from utils.fileio import atomic_write
+from utils import profiling
+from utils.audio import analyze_wav, sidecar_path
+from utils.fileio import atomic_write, file_lock
 from constants import (
+    DISCUSSION_LOCK_NAME as LOCK_NAME,
     DISCUSSIONS_DIR,
     DISCUSSION_ID_FORMAT,
     TIMESTAMP_FORMAT,
 )
 
+# Signature of change listeners: ``callback(event, info)``
+Listener = Callable[[str, Dict[str, Any]], None]
+
 
 class DiscussionStorage:
-    """Manage recordings and transcripts grouped by discussion."""
+    """Manage recordings and transcripts grouped by discussion.
+
+    Listeners registered with :meth:`subscribe` are called after each change
+    with an event name (``segment_added``, ``segment_updated``, ``renamed``,
+    ``opened``, ``saved`` or ``reset``) and a dict describing it. Segment
+    events carry the absolute path of the segment's audio as ``wav``.
+    """
 
     def __init__(self, auto_resume: bool = False) -> None:
         self.current_id: Optional[str] = None
@@ -25,6 +40,9 @@ class DiscussionStorage:
         self.segments: List[Dict[str, str]] = []
         self.segment_count: int = 0
         self.name: Optional[str] = None
+        # identity of the ``segments.json`` we last read or wrote
+        self._segments_stamp: Optional[Tuple[int, int]] = None
+        self._listeners: List[Listener] = []
 
         if auto_resume:
             self.resume_last_discussion()
@@ -37,8 +55,11 @@ class DiscussionStorage:
         if not dirs:
             return False
         dirs.sort()
-        latest = dirs[-1]
-        seg_path = os.path.join(DISCUSSIONS_DIR, latest, "segments.json")
+        return self._open_discussion(dirs[-1])
+
+    def _open_discussion(self, name: str) -> bool:
+        """Populate fields from discussion ``name``'s ``segments.json``."""
+        seg_path = os.path.join(DISCUSSIONS_DIR, name, "segments.json")
         if not os.path.exists(seg_path):
             return False
         try:
@@ -47,8 +68,8 @@ class DiscussionStorage:
         except Exception:
             return False
 
-        self.current_id = data.get("created_at", latest)
-        self.discussion_path = os.path.join(DISCUSSIONS_DIR, latest)
+        self.current_id = data.get("created_at", name)
+        self.discussion_path = os.path.join(DISCUSSIONS_DIR, name)
         self.audio_dir = os.path.join(self.discussion_path, "audio")
         self.transcripts_dir = os.path.join(self.discussion_path, "transcripts")
         self.segments_json = seg_path
@@ -56,12 +77,28 @@ class DiscussionStorage:
         self.segments = data.get("segments", [])
         self.segment_count = len(self.segments)
         self.name = data.get("name")
+        self._segments_stamp = self._stamp()
         return True
 
     def resume_last_discussion(self) -> bool:
         """Public wrapper to resume the most recent discussion."""
         return self._resume_last_discussion()
 
+    def open_discussion(self, name: str) -> bool:
+        """Make discussion ``name`` the current one."""
+        if not self._open_discussion(name):
+            return False
+        self._emit("opened", id=self.current_id)
+        return True
+
+    def subscribe(self, listener: Listener) -> None:
+        """Call ``listener(event, info)`` whenever the storage changes."""
+        self._listeners.append(listener)
+
+    def unsubscribe(self, listener: Listener) -> None:
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+
     # ------------------------------------------------------------------
     # internal helpers
     # ------------------------------------------------------------------
@@ -70,6 +107,35 @@ class DiscussionStorage:
             return
         data = {"created_at": self.current_id, "name": self.name, "segments": self.segments}
         atomic_write(self.segments_json, json.dumps(data, indent=2))
+        self._segments_stamp = self._stamp()
+
+    def _emit(self, event: str, **info: Any) -> None:
+        for listener in list(self._listeners):
+            try:
+                listener(event, info)
+            except Exception as exc:
+                print(f"Storage listener failed: {exc}")
+
+    def _stamp(self) -> Optional[Tuple[int, int]]:
+        try:
+            st = os.stat(self.segments_json)
+        except (OSError, TypeError):
+            return None
+        return st.st_ino, st.st_mtime_ns
+
+    @contextmanager
+    def _locked(self) -> Iterator[None]:
+        """Lock the current discussion and pick up changes made elsewhere.
+
+        Other processes (e.g. pre-forked server workers) may have appended
+        segments since we last looked, so reload ``segments.json`` when it
+        was replaced.
+        """
+        assert self.discussion_path
+        with file_lock(os.path.join(self.discussion_path, LOCK_NAME)):
+            if self._stamp() != self._segments_stamp:
+                self._open_discussion(os.path.basename(self.discussion_path))
+            yield
 
     def _rebuild_full_transcript(self) -> None:
         """Rewrite ``transcript_full.txt`` from individual segment files."""
@@ -85,10 +151,82 @@ class DiscussionStorage:
                 texts.append("")
         atomic_write(self.full_transcript, "\n\n".join(texts) + "\n")
 
+    def _existing_segment(self, audio_path: str) -> Optional[Dict[str, Any]]:
+        """Return the segment whose WAV is ``audio_path``, if any."""
+        assert self.audio_dir
+        audio_abs = os.path.abspath(audio_path)
+        if not audio_abs.startswith(os.path.abspath(self.audio_dir) + os.sep):
+            return None
+        seg_id = os.path.splitext(os.path.basename(audio_abs))[0]
+        for seg in self.segments:
+            if seg["id"] == seg_id:
+                return seg
+        return None
+
+    def _append_new_segment(
+        self,
+        text: str,
+        store_audio: Callable[[str], str],
+        duration: float,
+        info: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
+        """Allocate the next segment id and persist its audio and text.
+
+        ``store_audio`` receives the destination WAV path and returns the
+        path where the audio actually ended up. ``info`` is the audio's
+        :func:`analyze_wav` result when the caller computed it beforehand.
+        """
+        assert (
+            self.discussion_path
+            and self.audio_dir
+            and self.transcripts_dir
+            and self.full_transcript
+        )
+        self.segment_count += 1
+        seg_id = f"seg{self.segment_count:03d}"
+        wav_name = f"{seg_id}.wav"
+        txt_name = f"{seg_id}.txt"
+        wav_dest = store_audio(os.path.join(self.audio_dir, wav_name))
+        txt_dest = os.path.join(self.transcripts_dir, txt_name)
+        atomic_write(txt_dest, text.strip() + "\n")
+        entry = {
+            "id": seg_id,
+            "wav": os.path.relpath(wav_dest, self.discussion_path),
+            "txt": os.path.relpath(txt_dest, self.discussion_path),
+            "timestamp": datetime.now().strftime(TIMESTAMP_FORMAT),
+            "duration": duration,
+        }
+        _update_audio_metadata(self.discussion_path, entry, info)
+        self.segments.append(entry)
+        self._write_segments()
+        existing = os.path.exists(self.full_transcript) and os.path.getsize(self.full_transcript) > 0
+        with open(self.full_transcript, "a", encoding="utf-8") as f:
+            if existing:
+                f.write("\n\n")
+            f.write(text.strip())
+        return entry
+
+    def _rewrite_segment_text(self, entry: Dict[str, Any], text: str) -> None:
+        assert self.transcripts_dir
+        atomic_write(os.path.join(self.transcripts_dir, f"{entry['id']}.txt"), text.strip() + "\n")
+        self._write_segments()
+        self._rebuild_full_transcript()
+
     def _start_new_discussion(self) -> None:
         timestamp = datetime.now().strftime(DISCUSSION_ID_FORMAT)
-        self.current_id = timestamp
-        self.discussion_path = os.path.join(DISCUSSIONS_DIR, timestamp)
+        # Several storages may start a discussion within the same second;
+        # claim the folder atomically and add a suffix on collision.
+        discussion_id = timestamp
+        suffix = 1
+        while True:
+            try:
+                os.makedirs(os.path.join(DISCUSSIONS_DIR, discussion_id))
+                break
+            except FileExistsError:
+                suffix += 1
+                discussion_id = f"{timestamp}_{suffix}"
+        self.current_id = discussion_id
+        self.discussion_path = os.path.join(DISCUSSIONS_DIR, discussion_id)
         self.audio_dir = os.path.join(self.discussion_path, "audio")
         self.transcripts_dir = os.path.join(self.discussion_path, "transcripts")
         os.makedirs(self.audio_dir, exist_ok=True)
@@ -102,9 +240,10 @@ class DiscussionStorage:
         self.name = None
         atomic_write(
             self.segments_json,
-            json.dumps({"created_at": timestamp, "name": None, "segments": []}, indent=2),
+            json.dumps({"created_at": discussion_id, "name": None, "segments": []}, indent=2),
         )
         atomic_write(self.full_transcript, "")
+        self._segments_stamp = self._stamp()
 
     # ------------------------------------------------------------------
     # public API
@@ -120,12 +259,20 @@ class DiscussionStorage:
         self.segments = []
         self.segment_count = 0
         self.name = None
+        self._segments_stamp = None
+        self._emit("reset")
 
     def add_segment(self, text: str, audio_path: str, duration: float = 0.0) -> bool:
-        """Persist ``text`` and ``audio_path`` inside the current discussion."""
+        """Persist ``text`` and ``audio_path`` inside the current discussion.
+
+        Audio already in the discussion updates its segment. Audio stored in
+        any other discussion is left alone and ``False`` is returned.
+        """
         if not text:
             return True
         if self.current_id is None:
+            if _in_discussions(audio_path):
+                return False
             self._start_new_discussion()
         assert (
             self.discussion_path
@@ -133,45 +280,94 @@ class DiscussionStorage:
             and self.transcripts_dir
             and self.full_transcript
         )
-        audio_abs = os.path.abspath(audio_path)
-        audio_dir_abs = os.path.abspath(self.audio_dir)
-        if audio_abs.startswith(audio_dir_abs + os.sep):
-            seg_id = os.path.splitext(os.path.basename(audio_abs))[0]
-            for seg in self.segments:
-                if seg["id"] == seg_id:
-                    txt_dest = os.path.join(self.transcripts_dir, f"{seg_id}.txt")
-                    atomic_write(txt_dest, text.strip() + "\n")
-                    if duration:
-                        seg["duration"] = duration
-                    self._write_segments()
-                    self._rebuild_full_transcript()
-                    return True
+        # analyze new audio before taking the lock so other writers of the
+        # discussion don't wait for it
+        info = None
+        if not os.path.abspath(audio_path).startswith(os.path.abspath(self.audio_dir) + os.sep):
+            info = _analyze(audio_path)
+        with profiling.profiled("add_segment"), self._locked():
+            entry = self._existing_segment(audio_path)
+            if entry is not None:
+                if duration:
+                    entry["duration"] = duration
+                self._rewrite_segment_text(entry, text)
+                event = "segment_updated"
+            elif _in_discussions(audio_path):
+                # never take audio away from another discussion
+                return False
+            else:
 
-        self.segment_count += 1
-        seg_id = f"seg{self.segment_count:03d}"
-        wav_name = f"{seg_id}.wav"
-        txt_name = f"{seg_id}.txt"
-        wav_dest = os.path.join(self.audio_dir, wav_name)
-        try:
-            shutil.move(audio_path, wav_dest)
-        except Exception:
-            wav_dest = audio_path
-        txt_dest = os.path.join(self.transcripts_dir, txt_name)
-        atomic_write(txt_dest, text.strip() + "\n")
-        entry = {
-            "id": seg_id,
-            "wav": os.path.relpath(wav_dest, self.discussion_path),
-            "txt": os.path.relpath(txt_dest, self.discussion_path),
-            "timestamp": datetime.now().strftime(TIMESTAMP_FORMAT),
-            "duration": duration,
-        }
-        self.segments.append(entry)
-        self._write_segments()
-        existing = os.path.exists(self.full_transcript) and os.path.getsize(self.full_transcript) > 0
-        with open(self.full_transcript, "a", encoding="utf-8") as f:
-            if existing:
-                f.write("\n\n")
-            f.write(text.strip())
+                def move_audio(wav_dest: str) -> str:
+                    try:
+                        shutil.move(audio_path, wav_dest)
+                    except Exception:
+                        return audio_path
+                    return wav_dest
+
+                entry = self._append_new_segment(text, move_audio, duration, info)
+                event = "segment_added"
+        self._emit(
+            event,
+            id=self.current_id,
+            segment=entry,
+            text=text.strip(),
+            wav=os.path.join(self.discussion_path, entry["wav"]),
+        )
+        return True
+
+    def find_segment(self, audio_path: str) -> Optional[Dict[str, Any]]:
+        """Return the current discussion's segment whose WAV is ``audio_path``."""
+        if self.current_id is None:
+            return None
+        return self._existing_segment(audio_path)
+
+    def update_segment(self, text: str, audio_path: str) -> bool:
+        """Replace the text of the segment whose WAV is ``audio_path``.
+
+        Returns ``False``, changing nothing, when ``audio_path`` isn't a
+        segment of the current discussion.
+        """
+        if self.current_id is None:
+            return False
+        with profiling.profiled("add_segment"), self._locked():
+            entry = self._existing_segment(audio_path)
+            if entry is None:
+                return False
+            self._rewrite_segment_text(entry, text)
+        self._emit(
+            "segment_updated",
+            id=self.current_id,
+            segment=entry,
+            text=text.strip(),
+            wav=os.path.join(self.discussion_path, entry["wav"]),
+        )
+        return True
+
+    def add_segment_data(self, text: str, wav_data: bytes, duration: float = 0.0) -> bool:
+        """Persist ``text`` with in-memory WAV bytes as a new segment.
+
+        Unlike :meth:`add_segment` the audio is written straight into the
+        discussion's ``audio`` folder without staging a temporary file.
+        """
+        if not text:
+            return True
+        if self.current_id is None:
+            self._start_new_discussion()
+
+        def write_audio(wav_dest: str) -> str:
+            atomic_write(wav_dest, wav_data)
+            return wav_dest
+
+        info = _analyze(io.BytesIO(wav_data))
+        with profiling.profiled("add_segment"), self._locked():
+            entry = self._append_new_segment(text, write_audio, duration, info)
+        self._emit(
+            "segment_added",
+            id=self.current_id,
+            segment=entry,
+            text=text.strip(),
+            wav=os.path.join(self.discussion_path, entry["wav"]),
+        )
         return True
 
     # compatibility wrapper
@@ -187,7 +383,9 @@ class DiscussionStorage:
                 return None
             self._start_new_discussion()
         assert self.full_transcript
-        atomic_write(self.full_transcript, text.strip() + "\n")
+        with self._locked():
+            atomic_write(self.full_transcript, text.strip() + "\n")
+        self._emit("saved", id=self.current_id)
         return self.full_transcript
 
     def save(self, text: str, timestamp: Optional[str] = None) -> Optional[str]:
@@ -210,10 +408,42 @@ class DiscussionStorage:
         with open(path, "r", encoding="utf-8") as f:
             return f.read()
 
+    def load_segments(self, name: str, with_peaks: bool = False) -> Optional[List[Dict[str, Any]]]:
+        """Return the segment entries for discussion ``name``.
+
+        When ``with_peaks`` is true each entry also carries the ``peaks`` list
+        from its metadata sidecar so callers never need to decode the audio.
+        """
+        path = os.path.join(DISCUSSIONS_DIR, name, "segments.json")
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except Exception:
+            return None
+        segments = data.get("segments", [])
+        if with_peaks:
+            for seg in segments:
+                seg["peaks"] = _read_sidecar(os.path.join(DISCUSSIONS_DIR, name), seg).get("peaks", [])
+        return segments
+
+    def load_segment_text(self, name: str, segment: Dict[str, Any]) -> str:
+        """Return the text of one ``segment`` entry of discussion ``name``."""
+        try:
+            with open(os.path.join(DISCUSSIONS_DIR, name, segment["txt"]), "r", encoding="utf-8") as f:
+                return f.read().strip()
+        except (OSError, KeyError):
+            return ""
+
     def set_name(self, name: Optional[str]) -> None:
         """Set a user-friendly name for the current discussion."""
-        self.name = name.strip() if name else None
-        self._write_segments()
+        name = name.strip() if name else None
+        if not self.discussion_path:
+            self.name = name
+            return
+        with self._locked():
+            self.name = name
+            self._write_segments()
+        self._emit("renamed", id=self.current_id, name=name)
 
     def retranscribe_last_segment(self, transcribe_func: Callable[[str], str]) -> Optional[str]:
         if not self.segments:
@@ -225,10 +455,99 @@ class DiscussionStorage:
             new_text = transcribe_func(wav)
         except Exception:
             return None
-        atomic_write(txt, new_text.strip() + "\n")
-        self._rebuild_full_transcript()
+        with self._locked():
+            atomic_write(txt, new_text.strip() + "\n")
+            self._rebuild_full_transcript()
+        self._emit("segment_updated", id=self.current_id, segment=last, text=new_text.strip(), wav=wav)
         return new_text
 
 
+def _in_discussions(path: str) -> bool:
+    return os.path.abspath(path).startswith(os.path.abspath(DISCUSSIONS_DIR) + os.sep)
+
+
+def _read_sidecar(discussion_path: str, entry: Dict[str, Any]) -> Dict[str, Any]:
+    meta = entry.get("meta")
+    if not meta:
+        return {}
+    try:
+        with open(os.path.join(discussion_path, meta), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except Exception:
+        return {}
+
+
+def _analyze(source: Any) -> Optional[Dict[str, Any]]:
+    try:
+        return analyze_wav(source)
+    except (OSError, EOFError, wave.Error):
+        return None
+
+
+def _update_audio_metadata(
+    discussion_path: str, entry: Dict[str, Any], info: Optional[Dict[str, Any]] = None
+) -> bool:
+    """Fill ``entry`` with duration and levels and write its peaks sidecar.
+
+    ``info`` is analyzed from the segment's WAV unless given. Returns
+    ``False`` when the audio could not be analyzed, leaving ``entry``
+    untouched.
+    """
+    wav = os.path.join(discussion_path, entry["wav"])
+    if info is None:
+        info = _analyze(wav)
+    if info is None:
+        return False
+    sidecar = sidecar_path(wav)
+    atomic_write(sidecar, json.dumps(info, separators=(",", ":")))
+    entry["duration"] = info["duration"]
+    entry["rms"] = info["rms"]
+    entry["peak"] = info["peak"]
+    entry["meta"] = os.path.relpath(sidecar, discussion_path)
+    return True
+
+
+def backfill_metadata(names: Optional[List[str]] = None, force: bool = False) -> int:
+    """Compute missing audio metadata for existing discussions.
+
+    Parameters
+    ----------
+    names:
+        Discussion folders to process. Defaults to every discussion.
+    force:
+        Recompute metadata even when a sidecar already exists.
+
+    Returns
+    -------
+    int
+        Number of segments that were updated.
+    """
+    if names is None:
+        names = DiscussionStorage().list()
+    updated = 0
+    for name in names:
+        discussion_path = os.path.join(DISCUSSIONS_DIR, name)
+        seg_path = os.path.join(discussion_path, "segments.json")
+        if not os.path.exists(seg_path):
+            continue
+        with file_lock(os.path.join(discussion_path, LOCK_NAME)):
+            try:
+                with open(seg_path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+            except Exception:
+                continue
+            changed = False
+            for entry in data.get("segments", []):
+                meta = entry.get("meta")
+                if not force and meta and os.path.exists(os.path.join(discussion_path, meta)):
+                    continue
+                if _update_audio_metadata(discussion_path, entry):
+                    changed = True
+                    updated += 1
+            if changed:
+                atomic_write(seg_path, json.dumps(data, indent=2))
+    return updated
+
+
 # Backwards compatibility
 TranscriptStorage = DiscussionStorage
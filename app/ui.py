@@ -1,26 +1,29 @@
-import os
-import threading
+from collections import deque
+from concurrent.futures import CancelledError, Future
+
 import customtkinter as ctk
 
 from constants import (
     BUTTON_FG,
     BUTTON_HOVER,
     TEXT_COLOR,
-    DISCUSSIONS_DIR,
-    RECORDING_DIR,
+    TRANSCRIPT_PAGE_SEGMENTS,
 )
-from model import run_model
+import model
+import retention
+from model import run_model, run_model_cached
 from recorder import Recorder
+from scheduler import BULK, LIVE, RETRANSCRIBE, get_scheduler
 from storage import TranscriptStorage
+from utils import profiling
+
+# How often the "model loading" indicator checks the background load
+MODEL_STATUS_POLL_MS = 250
 
 
 def latest_audio_path() -> str | None:
-    """Return the most recent ``.wav`` file from :data:`RECORDING_DIR`."""
-    files = [f for f in os.listdir(RECORDING_DIR) if f.lower().endswith(".wav")]
-    if not files:
-        return None
-    files.sort(reverse=True)
-    return os.path.join(RECORDING_DIR, files[0])
+    """Return the most recent recording still in the recordings folder."""
+    return retention.get_index().latest()
 
 
 class ClearSayUI:
@@ -31,6 +34,18 @@ class ClearSayUI:
         self.transcripts = transcripts
         self.sidebar_visible = False
         self.current_timestamp: str | None = None
+        # Storage change events are coalesced into one refresh per idle tick
+        self._refresh_pending = False
+        self._pending_status: str | None = None
+        # Segment events wait here until the Tk thread applies them
+        self._pending_segments: deque[tuple[str, dict]] = deque()
+        # Transcript viewer: the discussion shown, its segment entries and
+        # how many of them are already inserted into the textbox
+        self._view_id: str | None = None
+        self._view_segments: list[dict] = []
+        self._view_loaded = 0
+        # idle callback that will insert the next page, if one is scheduled
+        self._view_more: str | None = None
 
         # App root must exist before any Tk variables are created
         self.app: ctk.CTk | None = None
@@ -55,6 +70,7 @@ class ClearSayUI:
         self._build_main()
         self.apply_theme_colors()
         self._bind_shortcuts()
+        self.transcripts.subscribe(self._on_storage_event)
 
     def _build_header(self) -> None:
         self.header_label = ctk.CTkLabel(
@@ -104,6 +120,14 @@ class ClearSayUI:
         self.discussion_label.grid(row=0, column=0, padx=20, pady=(5, 0), sticky="w")
         self.update_discussion_label()
 
+        self.model_label = ctk.CTkLabel(
+            self.main_frame,
+            text="",
+            text_color=TEXT_COLOR,
+            font=ctk.CTkFont(size=12, slant="italic"),
+        )
+        self.model_label.grid(row=0, column=0, padx=20, pady=(5, 0), sticky="e")
+
         ctk.CTkLabel(
             self.main_frame,
             text="Press 'Start Recording', speak, then wait for the transcription.",
@@ -128,15 +152,25 @@ class ClearSayUI:
         except Exception:
             pass
 
+        text_frame = ctk.CTkFrame(self.main_frame, fg_color="transparent")
+        text_frame.grid(row=4, column=0, padx=20, pady=20, sticky="nsew")
+        text_frame.grid_rowconfigure(0, weight=1)
+        text_frame.grid_columnconfigure(0, weight=1)
+        # our own scrollbar so every scroll (wheel, drag, keys) reaches
+        # _on_text_scroll, which pages in more segments
         self.text_box = ctk.CTkTextbox(
-            self.main_frame,
+            text_frame,
             width=550,
             height=400,
             state="disabled",
             border_width=1,
             corner_radius=8,
+            activate_scrollbars=False,
         )
-        self.text_box.grid(row=4, column=0, padx=20, pady=20, sticky="nsew")
+        self.text_box.grid(row=0, column=0, sticky="nsew")
+        self.text_scrollbar = ctk.CTkScrollbar(text_frame, command=self.text_box.yview)
+        self.text_scrollbar.grid(row=0, column=1, sticky="ns")
+        self.text_box.configure(yscrollcommand=self._on_text_scroll)
 
         button_frame = ctk.CTkFrame(self.main_frame, fg_color="transparent")
         button_frame.grid(row=5, column=0, pady=10)
@@ -223,8 +257,27 @@ class ClearSayUI:
 
     # Public API
     def run(self) -> None:
+        # torch, whisper and the weights load once the window is up
+        self.app.after_idle(self._start_model_load)
+        retention.start_background_sweep()
         self.app.mainloop()
 
+    def _start_model_load(self) -> None:
+        model.start_background_load()
+        self._poll_model_status()
+
+    def _poll_model_status(self) -> None:
+        """Show the background model load until it finishes."""
+        status = model.status()
+        if status["phase"] == "ready":
+            self.model_label.configure(text="")
+        elif status["phase"] == "failed":
+            self.model_label.configure(text=f"Model failed to load: {status['error']}")
+        else:
+            text = "Warming up model..." if status["phase"] == "warming" else "Loading model..."
+            self.model_label.configure(text=text)
+            self.app.after(MODEL_STATUS_POLL_MS, self._poll_model_status)
+
     # Methods mapped from original functions
     def toggle_recording(self) -> None:
         if not self.recorder.recording:
@@ -244,11 +297,7 @@ class ClearSayUI:
             file_path = self.recorder.stop()
             if file_path:
                 self.current_timestamp = self.recorder.last_timestamp
-                threading.Thread(
-                    target=self.process_transcription,
-                    args=(file_path,),
-                    daemon=True,
-                ).start()
+                self.process_transcription(file_path)
             else:
                 self.start_button.configure(
                     text="Start Recording",
@@ -257,26 +306,35 @@ class ClearSayUI:
                 )
 
     def process_transcription(self, file_path: str) -> None:
-        """Run the model and update the UI when finished."""
+        """Schedule the model and update the UI when finished."""
+        cap = profiling.begin("ui")
+        with profiling.activate(cap):
+            future = get_scheduler().submit(run_model, file_path, priority=LIVE)
+        future.add_done_callback(
+            lambda f: self.app.after(0, lambda: self._transcription_done(f, file_path, cap))
+        )
+
+    def _transcription_done(
+        self, future: Future, file_path: str, cap: profiling.Capture | None
+    ) -> None:
         try:
-            transcription = run_model(file_path)
-        except Exception:
-            self.app.after(0, lambda: self._handle_transcription_error("Transcription failed"))
+            transcription = future.result()
+        except (Exception, CancelledError):
+            if cap is not None:
+                cap.finish()
+            self._handle_transcription_error("Transcription failed")
             return
-        self.app.after(0, lambda: self._update_transcription_ui(transcription, file_path))
+        self._update_transcription_ui(transcription, file_path, cap)
 
-    def _update_transcription_ui(self, transcription: str, audio_path: str) -> None:
-        self.text_box.configure(state="normal")
-        if self.text_box.get("1.0", "end").strip():
-            self.text_box.insert("end", "\n\n" + transcription)
-        else:
-            self.text_box.insert("end", transcription)
-        self.text_box.configure(state="disabled")
+    def _update_transcription_ui(
+        self, transcription: str, audio_path: str, cap: profiling.Capture | None = None
+    ) -> None:
+        # the segment_added event appends the text to the viewer
         self.status_label.configure(text="")
-        self.transcripts.add_segment(transcription, audio_path)
-        self.save_current_transcript()
-        self.update_discussion_label()
-        self.refresh_transcripts_list(self.search_var.get())
+        with profiling.activate(cap):
+            self.transcripts.add_segment(transcription, audio_path)
+        if cap is not None:
+            cap.finish()
         self.start_button.configure(
             text="Start Recording",
             state="normal",
@@ -285,35 +343,122 @@ class ClearSayUI:
         self.retranscribe_button.configure(state="normal")
 
     def copy_to_clipboard(self) -> None:
-        text = self.text_box.get("1.0", "end").strip()
+        # the viewer may hold only the first pages of a long discussion
+        text = self.transcripts.load(self._view_id) if self._view_id else None
+        if text is None:
+            text = self.text_box.get("1.0", "end")
+        text = text.strip()
         if text:
             self.app.clipboard_clear()
             self.app.clipboard_append(text)
 
-    def save_current_transcript(self) -> None:
-        text = self.text_box.get("1.0", "end").strip()
-        path = self.transcripts.save(text, self.current_timestamp)
-        if path is None:
-            self.status_label.configure(text="Failed to save transcript")
+    def _on_storage_event(self, event: str, info: dict) -> None:
+        """Schedule a single UI refresh for any burst of storage changes."""
+        if event == "segment_added":
+            self._pending_status = f"Saved {info['segment']['id']}"
+            # compute the segment's features while idle so a later
+            # retranscription can skip decoding
+            get_scheduler().submit(model.cache_features, info["wav"], priority=BULK)
+        if event in ("segment_added", "segment_updated"):
+            self._pending_segments.append((event, info))
+        if self._refresh_pending:
             return
-        self.status_label.configure(text=f"Saved {os.path.basename(path)}")
-        self.refresh_transcripts_list(self.search_var.get())
+        self._refresh_pending = True
+        self.app.after_idle(self._flush_storage_events)
+
+    def _flush_storage_events(self) -> None:
+        self._refresh_pending = False
+        while self._pending_segments:
+            self._apply_segment_event(*self._pending_segments.popleft())
+        if self._pending_status is not None:
+            self.status_label.configure(text=self._pending_status)
+            self._pending_status = None
+        self.update_discussion_label()
+        if self.sidebar_visible:
+            self.refresh_transcripts_list(self.search_var.get())
 
-    def clear_transcript(self) -> None:
-        self.save_current_transcript()
+    def _apply_segment_event(self, event: str, info: dict) -> None:
+        segment = info["segment"]
+        if event == "segment_updated":
+            if info["id"] == self._view_id:
+                self._replace_segment(segment["id"], info["text"])
+            return
+        if self._view_id not in (None, info["id"]):
+            # a live segment switches the viewer back to the current discussion
+            self.display_transcript(info["id"])
+            return
+        self._view_id = info["id"]
+        self._view_segments.append(segment)
+        if self._view_loaded == len(self._view_segments) - 1:
+            self.text_box.configure(state="normal")
+            self._insert_segment(segment, info["text"])
+            self.text_box.configure(state="disabled")
+            self.text_box.see("end")
+
+    def _reset_view(self, name: str | None, segments: list[dict]) -> None:
+        if self._view_more is not None:
+            self.app.after_cancel(self._view_more)
+            self._view_more = None
+        self._view_id = name
+        self._view_segments = segments
+        self._view_loaded = 0
         self.text_box.configure(state="normal")
         self.text_box.delete("1.0", "end")
         self.text_box.configure(state="disabled")
+
+    def _insert_segment(self, segment: dict, text: str) -> None:
+        """Append ``text`` to the (editable) viewer, tagged with the segment id."""
+        if self._view_loaded:
+            self.text_box.insert("end", "\n\n")
+        self.text_box.insert("end", text, segment["id"])
+        self._view_loaded += 1
+
+    def _replace_segment(self, segment_id: str, text: str) -> None:
+        """Swap the text of one displayed segment in place."""
+        ranges = self.text_box.tag_ranges(segment_id)
+        if not ranges:
+            return  # not paged in yet; it is read from disk when it is
+        self.text_box.configure(state="normal")
+        self.text_box.delete(ranges[0], ranges[-1])
+        self.text_box.insert(ranges[0], text, segment_id)
+        self.text_box.configure(state="disabled")
+
+    def _load_more_segments(self) -> None:
+        """Insert the next page of segments."""
+        self._view_more = None
+        end = min(self._view_loaded + TRANSCRIPT_PAGE_SEGMENTS, len(self._view_segments))
+        self.text_box.configure(state="normal")
+        for segment in self._view_segments[self._view_loaded:end]:
+            self._insert_segment(segment, self.transcripts.load_segment_text(self._view_id, segment))
+        self.text_box.configure(state="disabled")
+
+    def _on_text_scroll(self, first: str, last: str) -> None:
+        """Track the textbox view; page in more once it nears the bottom.
+
+        Tk calls this whenever the visible part of the text changes, including
+        after a page is inserted, so a page too short to fill the view is
+        followed by the next one.
+        """
+        self.text_scrollbar.set(first, last)
+        if (
+            float(last) > 0.9
+            and self._view_more is None
+            and self._view_loaded < len(self._view_segments)
+        ):
+            self._view_more = self.app.after_idle(self._load_more_segments)
+
+    def clear_transcript(self) -> None:
+        # Segments are persisted as they arrive, so there is nothing to save
+        self._reset_view(None, [])
         self.transcripts.new()
         self.current_timestamp = None
-        self.update_discussion_label()
 
     def new_transcription(self) -> None:
         self.clear_transcript()
         self.status_label.configure(text="")
 
     def on_close(self) -> None:
-        self.save_current_transcript()
+        self.transcripts.unsubscribe(self._on_storage_event)
         self.app.destroy()
 
     def apply_theme_colors(self) -> None:
@@ -365,17 +510,20 @@ class ClearSayUI:
             ).pack(pady=5)
 
     def display_transcript(self, name: str) -> None:
-        content = self.transcripts.load(name)
-        if content is None:
-            return
-        # allow subsequent saves to overwrite the opened transcript
-        self.transcripts.current_path = os.path.join(
-            DISCUSSIONS_DIR, name, "transcript_full.txt"
-        )
-        self.text_box.configure(state="normal")
-        self.text_box.delete("1.0", "end")
-        self.text_box.insert("1.0", content)
-        self.text_box.configure(state="disabled")
+        """Show discussion ``name``, loading segments a page at a time."""
+        segments = self.transcripts.load_segments(name)
+        if segments is None:
+            # discussions saved before segments.json only have the full text
+            content = self.transcripts.load(name)
+            if content is None:
+                return
+            self._reset_view(name, [])
+            self.text_box.configure(state="normal")
+            self.text_box.insert("1.0", content)
+            self.text_box.configure(state="disabled")
+        else:
+            self._reset_view(name, segments)
+            self._load_more_segments()
         self.discussion_label.configure(text=f"Viewing: {name}")
 
     def retranscribe_latest_audio(self) -> None:
@@ -392,26 +540,28 @@ class ClearSayUI:
         self.start_button.configure(state="disabled")
         self.retranscribe_button.configure(state="disabled")
         self.status_label.configure(text="Transcribing...")
-        threading.Thread(target=self._retranscribe_thread, daemon=True).start()
+        future = get_scheduler().submit(
+            self._retranscribe_job, priority=RETRANSCRIBE, key="ui-retranscribe"
+        )
+        future.add_done_callback(lambda f: self.app.after(0, lambda: self._retranscription_done(f)))
 
-    def _retranscribe_thread(self) -> None:
-        new_text = self.transcripts.retranscribe_last_segment(run_model)
+    def _retranscribe_job(self) -> str | None:
+        with profiling.capture("ui_retranscribe"):
+            return self.transcripts.retranscribe_last_segment(run_model_cached)
+
+    def _retranscription_done(self, future: Future) -> None:
+        try:
+            new_text = future.result()
+        except (Exception, CancelledError):
+            new_text = None
         if new_text is None:
-            self.app.after(0, lambda: self._handle_transcription_error("Transcription failed"))
+            self._handle_transcription_error("Transcription failed")
             return
-        self.app.after(0, lambda: self._update_retranscription_ui())
+        self._update_retranscription_ui()
 
     def _update_retranscription_ui(self) -> None:
-        content = self.transcripts.load(self.transcripts.current_id)
-        if content is None:
-            content = ""
-        self.text_box.configure(state="normal")
-        self.text_box.delete("1.0", "end")
-        self.text_box.insert("1.0", content)
-        self.text_box.configure(state="disabled")
+        # the segment_updated event already replaced the segment's text
         self.status_label.configure(text="")
-        self.update_discussion_label()
-        self.refresh_transcripts_list(self.search_var.get())
         self.start_button.configure(
             text="Start Recording",
             state="normal",
@@ -0,0 +1,130 @@
+import array
+import operator
+import os
+import sys
+import wave
+from typing import Any, BinaryIO, Dict, List, Tuple, Union
+
+# Number of buckets in the downsampled waveform stored alongside each segment
+PEAK_BUCKETS = 200
+
+_TYPECODES = {1: "B", 2: "h", 4: "i"}
+_DTYPES = {1: "u1", 2: "<i2", 4: "<i4"}
+# Samples converted to float64 at a time when summing squares with numpy
+_BLOCK = 1 << 20
+
+
+def sidecar_path(wav_path: str) -> str:
+    """Return the metadata file stored next to ``wav_path``."""
+    return os.path.splitext(wav_path)[0] + ".meta.json"
+
+
+def _read_wav(source: Union[str, BinaryIO]) -> Tuple[bytes, int, int, int]:
+    """Return ``(frames, sample_rate, channels, width)`` for a PCM WAV file."""
+    with wave.open(source, "rb") as wf:
+        channels = wf.getnchannels()
+        width = wf.getsampwidth()
+        rate = wf.getframerate()
+        raw = wf.readframes(wf.getnframes())
+    if width not in _TYPECODES:
+        raise wave.Error(f"unsupported sample width: {width}")
+    return raw[: len(raw) - len(raw) % width], rate, channels, width
+
+
+def _levels(raw: bytes, width: int, channels: int, frames: int, buckets: int) -> Tuple[float, List[int]]:
+    """Return the mean square and per-bucket peak magnitude of the samples.
+
+    Uses the standard library only; :func:`_levels_numpy` is the fast path.
+    """
+    samples = array.array(_TYPECODES[width])
+    if samples.itemsize != width:
+        raise wave.Error(f"unsupported sample width: {width}")
+    samples.frombytes(raw)
+    if width > 1 and sys.byteorder == "big":
+        samples.byteswap()
+    if width == 1:
+        # 8-bit WAV data is unsigned; centre it around zero
+        samples = array.array("h", (s - 128 for s in samples))
+    mean_square = sum(map(operator.mul, samples, samples)) / len(samples)
+    peaks = []
+    for i in range(buckets):
+        # keep bucket edges on frame boundaries so channels stay together
+        start = (i * frames // buckets) * channels
+        end = ((i + 1) * frames // buckets) * channels
+        chunk = samples[start:end]
+        peaks.append(max(max(chunk), -min(chunk)) if chunk else 0)
+    return mean_square, peaks
+
+
+def _levels_numpy(
+    np: Any, raw: bytes, width: int, channels: int, frames: int, buckets: int
+) -> Tuple[float, List[int]]:
+    samples = np.frombuffer(raw, dtype=_DTYPES[width])
+    if width == 1:
+        samples = samples.astype(np.int16) - 128
+    # accumulate in float64 a block at a time to bound the extra memory
+    sum_squares = 0.0
+    for i in range(0, len(samples), _BLOCK):
+        block = samples[i : i + _BLOCK].astype(np.float64)
+        sum_squares += float(np.dot(block, block))
+    # buckets hold at least one frame each, so no slice passed to reduceat
+    # is empty
+    starts = (np.arange(buckets, dtype=np.int64) * frames // buckets) * channels
+    highs = np.maximum.reduceat(samples, starts).astype(np.int64)
+    lows = np.minimum.reduceat(samples, starts).astype(np.int64)
+    return sum_squares / len(samples), np.maximum(highs, -lows).tolist()
+
+
+def analyze_wav(source: Union[str, BinaryIO], buckets: int = PEAK_BUCKETS) -> Dict[str, Any]:
+    """Compute duration, level and waveform peaks for a WAV file.
+
+    The samples are processed with numpy when it is installed and with the
+    standard library otherwise.
+
+    Parameters
+    ----------
+    source:
+        Path or binary file object containing PCM WAV data.
+    buckets:
+        Number of points in the returned ``peaks`` list.
+
+    Returns
+    -------
+    dict
+        ``duration`` in seconds, ``rms`` and ``peak`` levels normalised to
+        ``0..1`` and ``peaks``, the maximum absolute level of each bucket.
+    """
+    raw, rate, channels, width = _read_wav(source)
+    full_scale = float(1 << (8 * width - 1))
+    count = len(raw) // width
+    frames = count // channels if channels else 0
+    duration = frames / rate if rate else 0.0
+
+    if not count:
+        return {
+            "duration": round(duration, 3),
+            "sample_rate": rate,
+            "channels": channels,
+            "rms": 0.0,
+            "peak": 0.0,
+            "peaks": [],
+        }
+
+    n = max(1, min(buckets, frames))
+    try:
+        import numpy as np
+    except ImportError:
+        mean_square, levels = _levels(raw, width, channels, frames, n)
+    else:
+        mean_square, levels = _levels_numpy(np, raw, width, channels, frames, n)
+    rms = mean_square**0.5 / full_scale
+    peaks = [round(min(level / full_scale, 1.0), 3) for level in levels]
+
+    return {
+        "duration": round(duration, 3),
+        "sample_rate": rate,
+        "channels": channels,
+        "rms": round(min(rms, 1.0), 4),
+        "peak": max(peaks),
+        "peaks": peaks,
+    }
@@ -0,0 +1,134 @@
+"""Cache of model input features stored next to segment audio.
+
+Features (log-mel spectrograms for Whisper) are saved as ``segNNN.mel.npy``
+beside ``segNNN.wav`` in float16, which halves their size and lets
+:func:`cached` memory-map them instead of reading them whole. The content
+signature of the WAV they were computed from is kept as ``mel_signature``
+in the segment's ``.meta.json`` metadata; when the audio changes, or the
+metadata is rewritten, the cached features are ignored and recomputed.
+The metadata is updated under the discussion's lock, like every other
+writer of it.
+
+Features computed while transcribing audio for the first time are handed
+over with :func:`remember`, keyed by the audio's signature, so caching them
+once the audio is stored as a segment doesn't extract them again. Only the
+last :data:`RECENT_ENTRIES` are kept in memory.
+
+numpy is imported on first use. Without it features are never cached.
+"""
+
+import hashlib
+import io
+import json
+import os
+import threading
+from collections import OrderedDict
+from contextlib import nullcontext
+from typing import Any, Callable, ContextManager, Dict, Optional
+
+from constants import DISCUSSION_LOCK_NAME
+from utils import profiling
+from utils.audio import sidecar_path
+from utils.fileio import atomic_write, file_lock
+
+FEATURES_SUFFIX = ".mel.npy"
+RECENT_ENTRIES = 8
+
+_recent: "OrderedDict[str, Any]" = OrderedDict()
+_recent_lock = threading.Lock()
+
+
+def features_path(wav_path: str) -> str:
+    return os.path.splitext(wav_path)[0] + FEATURES_SUFFIX
+
+
+def wav_signature(wav_path: str) -> str:
+    """Return a digest of the contents of ``wav_path``."""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(wav_path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def data_signature(data: bytes) -> str:
+    """Return the :func:`wav_signature` a file containing ``data`` would have."""
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def remember(signature: str, features: Any) -> None:
+    """Keep ``features`` of the audio with ``signature`` for :func:`cached`."""
+    with _recent_lock:
+        _recent[signature] = features
+        _recent.move_to_end(signature)
+        while len(_recent) > RECENT_ENTRIES:
+            _recent.popitem(last=False)
+
+
+def _take(signature: str) -> Optional[Any]:
+    with _recent_lock:
+        return _recent.pop(signature, None)
+
+
+def _discussion_lock(wav_path: str) -> ContextManager[None]:
+    # segment audio is stored in ``<discussion>/audio``
+    discussion = os.path.dirname(os.path.dirname(os.path.abspath(wav_path)))
+    lock = os.path.join(discussion, DISCUSSION_LOCK_NAME)
+    return file_lock(lock) if os.path.isfile(lock) else nullcontext()
+
+
+def _read_meta(wav_path: str) -> Dict[str, Any]:
+    try:
+        with open(sidecar_path(wav_path), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def load(wav_path: str, signature: str) -> Optional[Any]:
+    """Return the cached features for ``wav_path`` if they match ``signature``."""
+    if _read_meta(wav_path).get("mel_signature") != signature:
+        return None
+    try:
+        import numpy as np
+
+        return np.load(features_path(wav_path), mmap_mode="r")
+    except (ImportError, OSError, ValueError):
+        return None
+
+
+def save(wav_path: str, features: Any, signature: str) -> bool:
+    """Store ``features`` for the audio with ``signature``."""
+    try:
+        import numpy as np
+    except ImportError:
+        return False
+    buf = io.BytesIO()
+    np.save(buf, np.asarray(features, dtype=np.float16))
+    atomic_write(features_path(wav_path), buf.getvalue())
+    with _discussion_lock(wav_path):
+        meta = _read_meta(wav_path)
+        meta["mel_signature"] = signature
+        atomic_write(sidecar_path(wav_path), json.dumps(meta, separators=(",", ":")))
+    return True
+
+
+def cached(wav_path: str, extract: Callable[[str], Optional[Any]]) -> Optional[Any]:
+    """Return features for ``wav_path``, computing them with ``extract`` on a miss.
+
+    Features passed to :func:`remember` for the same audio are stored
+    instead of calling ``extract``. ``extract`` may return ``None`` when its
+    backend has no cacheable features; nothing is stored then.
+    """
+    signature = wav_signature(wav_path)
+    with profiling.span("features_load"):
+        features = load(wav_path, signature)
+    if features is not None:
+        return features
+    features = _take(signature)
+    if features is None:
+        with profiling.span("features_extract"):
+            features = extract(wav_path)
+    if features is not None:
+        save(wav_path, features, signature)
+    return features
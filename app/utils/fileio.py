@@ -1,17 +1,47 @@
 import os
 import tempfile
-from typing import Union
+import time
+from contextlib import contextmanager
+from typing import Iterator, Union
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+from utils import profiling
+from utils.metrics import STORAGE_WRITE_SECONDS
 
 
 def atomic_write(path: str, data: Union[str, bytes]) -> None:
     """Write ``data`` to ``path`` atomically."""
+    start = time.perf_counter()
     dir_name = os.path.dirname(path) or '.'
     mode = 'w'
     if isinstance(data, bytes):
         mode = 'wb'
-    with tempfile.NamedTemporaryFile(mode, dir=dir_name, delete=False, encoding=None if isinstance(data, bytes) else 'utf-8') as tmp:
-        tmp.write(data)
-        tmp.flush()
-        os.fsync(tmp.fileno())
-    os.replace(tmp.name, path)
+    with profiling.span("atomic_write"):
+        with tempfile.NamedTemporaryFile(mode, dir=dir_name, delete=False, encoding=None if isinstance(data, bytes) else 'utf-8') as tmp:
+            tmp.write(data)
+            tmp.flush()
+            os.fsync(tmp.fileno())
+        os.replace(tmp.name, path)
+    STORAGE_WRITE_SECONDS.observe(time.perf_counter() - start)
+
+
+@contextmanager
+def file_lock(path: str) -> Iterator[None]:
+    """Hold an exclusive advisory lock on ``path`` across processes.
 
+    The lock file is created if needed. On platforms without ``fcntl`` this
+    is a no-op.
+    """
+    if fcntl is None:
+        yield
+        return
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        yield
+    finally:
+        os.close(fd)
@@ -0,0 +1,114 @@
+import io
+import math
+import wave
+
+import numpy as np
+
+# Whisper expects mono float32 audio at this rate
+MODEL_SAMPLE_RATE = 16000
+
+# Resampling filter: zero crossings of the windowed sinc on either side, and
+# its cutoff as a fraction of the lower Nyquist frequency
+RESAMPLE_ZERO_CROSSINGS = 16
+RESAMPLE_ROLLOFF = 0.95
+# Output samples computed at a time, bounding the memory used by resample
+_RESAMPLE_BLOCK = 1 << 14
+
+
+def pcm16_to_wav_bytes(data: bytes, sample_rate: int, channels: int = 1) -> bytes:
+    """Wrap raw little-endian 16-bit PCM ``data`` in a WAV container."""
+    frame_size = 2 * channels
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as wf:
+        wf.setnchannels(channels)
+        wf.setsampwidth(2)
+        wf.setframerate(sample_rate)
+        wf.writeframes(data[: len(data) - len(data) % frame_size])
+    return buf.getvalue()
+
+
+def upload_to_wav_bytes(body: bytes, sample_rate: int, channels: int = 1) -> bytes:
+    """Return an uploaded ``body`` as WAV bytes.
+
+    A body starting with a RIFF header is already a WAV file; anything else
+    is raw 16-bit PCM described by ``sample_rate`` and ``channels``. Raises
+    ``ValueError`` when that description is invalid.
+    """
+    if body[:4] == b"RIFF":
+        return bytes(body)
+    if sample_rate <= 0 or channels <= 0:
+        raise ValueError("invalid PCM format")
+    return pcm16_to_wav_bytes(bytes(body), sample_rate, channels)
+
+
+def decode_wav_bytes(data: bytes) -> np.ndarray:
+    """Decode in-memory WAV ``data`` into model-ready audio.
+
+    Returns
+    -------
+    np.ndarray
+        Mono float32 samples in ``[-1, 1]`` resampled to
+        :data:`MODEL_SAMPLE_RATE`.
+    """
+    with wave.open(io.BytesIO(data), "rb") as wf:
+        channels = wf.getnchannels()
+        width = wf.getsampwidth()
+        rate = wf.getframerate()
+        raw = wf.readframes(wf.getnframes())
+    if width == 1:
+        samples = (np.frombuffer(raw, dtype=np.uint8).astype(np.float32) - 128.0) / 128.0
+    elif width == 2:
+        samples = np.frombuffer(raw, dtype="<i2").astype(np.float32) / 32768.0
+    elif width == 4:
+        samples = np.frombuffer(raw, dtype="<i4").astype(np.float32) / 2147483648.0
+    else:
+        raise wave.Error(f"unsupported sample width: {width}")
+    if channels > 1:
+        samples = samples[: len(samples) - len(samples) % channels]
+        samples = samples.reshape(-1, channels).mean(axis=1)
+    return resample(samples, rate)
+
+
+def _resample_filter(up: int, cutoff: float, half_width: int) -> np.ndarray:
+    """Return the windowed-sinc taps for each of the ``up`` output phases.
+
+    Row ``p`` weights the input samples ``-half_width + 1 .. half_width``
+    around an output that falls ``p / up`` of the way past an input sample.
+    """
+    offsets = np.arange(-half_width + 1, half_width + 1, dtype=np.float64)
+    distance = offsets[None, :] - np.arange(up, dtype=np.float64)[:, None] / up
+    x = np.clip(distance / half_width, -1.0, 1.0)
+    blackman = 0.42 + 0.5 * np.cos(np.pi * x) + 0.08 * np.cos(2 * np.pi * x)
+    taps = cutoff * np.sinc(cutoff * distance) * blackman
+    # unit gain at DC for every phase
+    return (taps / taps.sum(axis=1, keepdims=True)).astype(np.float32)
+
+
+def resample(samples: np.ndarray, rate: int, target: int = MODEL_SAMPLE_RATE) -> np.ndarray:
+    """Resample mono ``samples`` from ``rate`` to ``target`` Hz.
+
+    Each output sample is a windowed-sinc interpolation of the input, low
+    passed below the lower of the two Nyquist frequencies so content the
+    target rate can't represent is removed rather than aliased. The ratio
+    is reduced to ``up / down`` and the filter precomputed for each of the
+    ``up`` output phases.
+    """
+    if rate == target or not len(samples):
+        return samples.astype(np.float32, copy=False)
+    g = math.gcd(rate, target)
+    up, down = target // g, rate // g
+    cutoff = min(1.0, target / rate) * RESAMPLE_ROLLOFF
+    half_width = int(math.ceil(RESAMPLE_ZERO_CROSSINGS / cutoff))
+    table = _resample_filter(up, cutoff, half_width)
+
+    count = int(round(len(samples) * target / rate))
+    position = np.arange(count, dtype=np.int64) * down
+    base, phase = position // up, position % up
+    padded = np.pad(samples.astype(np.float32, copy=False), (half_width, half_width + 2))
+    # row ``base + 1`` holds the inputs ``base - half_width + 1 .. base + half_width``
+    windows = np.lib.stride_tricks.sliding_window_view(padded, 2 * half_width)
+    out = np.empty(count, dtype=np.float32)
+    for start in range(0, count, _RESAMPLE_BLOCK):
+        block = slice(start, start + _RESAMPLE_BLOCK)
+        out[block] = np.einsum("ij,ij->i", windows[base[block] + 1], table[phase[block]])
+    return out
@@ -0,0 +1,218 @@
+"""Opt-in profiling of transcriptions.
+
+Arm a number of captures with :func:`arm` (or ``CLEARSAY_PROFILE=N`` in the
+environment). The next ``N`` transcriptions wrapped in :func:`capture` record
+timing spans, a Python profile and, when torch is loaded, a PyTorch operator
+profile. Results are written to ``saved_data/profiles``.
+
+When nothing is armed :func:`span` and :func:`profiled` cost a single
+context variable lookup.
+"""
+
+import contextvars
+import cProfile
+import json
+import os
+import pstats
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional
+
+from constants import DATA_DIR, TIMESTAMP_FORMAT
+
+PROFILE_DIR = os.path.join(DATA_DIR, "profiles")
+
+_lock = threading.Lock()
+_remaining = int(os.environ.get("CLEARSAY_PROFILE", "0") or 0)
+_last_outputs: List[str] = []
+_CURRENT: "contextvars.ContextVar[Optional[Capture]]" = contextvars.ContextVar(
+    "clearsay_profile_capture", default=None
+)
+
+
+class Capture:
+    """Spans and profiles collected for one transcription."""
+
+    def __init__(self, label: str) -> None:
+        self.label = label
+        self.started = datetime.now()
+        self.t0 = time.perf_counter()
+        self.spans: List[Dict[str, Any]] = []
+        self.profiles: List[cProfile.Profile] = []
+        self.torch_tables: List[str] = []
+        self.torch_traces: List[Any] = []
+        self._lock = threading.Lock()
+
+    def add_span(self, name: str, start: float, end: float) -> None:
+        with self._lock:
+            self.spans.append(
+                {
+                    "name": name,
+                    "start": round(start - self.t0, 6),
+                    "seconds": round(end - start, 6),
+                    "thread": threading.current_thread().name,
+                }
+            )
+
+    @contextmanager
+    def activate(self) -> Iterator["Capture"]:
+        """Make this capture current, e.g. in a different thread."""
+        token = _CURRENT.set(self)
+        try:
+            yield self
+        finally:
+            _CURRENT.reset(token)
+
+    def stages(self) -> Dict[str, Dict[str, float]]:
+        totals: Dict[str, Dict[str, float]] = {}
+        for s in self.spans:
+            entry = totals.setdefault(s["name"], {"seconds": 0.0, "calls": 0})
+            entry["seconds"] = round(entry["seconds"] + s["seconds"], 6)
+            entry["calls"] += 1
+        return totals
+
+    def finish(self) -> Optional[str]:
+        """Write the collected data and return the path of the summary."""
+        try:
+            os.makedirs(PROFILE_DIR, exist_ok=True)
+            base = os.path.join(
+                PROFILE_DIR, f"{self.started.strftime(TIMESTAMP_FORMAT)}_{self.label}"
+            )
+            summary = {
+                "label": self.label,
+                "started": self.started.isoformat(),
+                "total_seconds": round(time.perf_counter() - self.t0, 6),
+                "stages": self.stages(),
+                "spans": self.spans,
+            }
+            if self.profiles:
+                stats = pstats.Stats(self.profiles[0])
+                for extra in self.profiles[1:]:
+                    stats.add(extra)
+                stats.dump_stats(base + ".prof")
+                summary["python_profile"] = base + ".prof"
+            if self.torch_tables:
+                with open(base + ".torch.txt", "w", encoding="utf-8") as f:
+                    f.write("\n\n".join(self.torch_tables))
+                summary["torch_profile"] = base + ".torch.txt"
+            for i, prof in enumerate(self.torch_traces):
+                trace = f"{base}.trace{i}.json"
+                prof.export_chrome_trace(trace)
+                summary.setdefault("torch_traces", []).append(trace)
+            with open(base + ".json", "w", encoding="utf-8") as f:
+                json.dump(summary, f, indent=2)
+        except Exception as exc:
+            print(f"Failed to write profile: {exc}")
+            return None
+        with _lock:
+            _last_outputs.append(base + ".json")
+            del _last_outputs[:-10]
+        return base + ".json"
+
+
+def arm(count: int) -> int:
+    """Profile the next ``count`` transcriptions. Returns the armed total."""
+    global _remaining
+    with _lock:
+        _remaining = max(0, count)
+        return _remaining
+
+
+def status() -> Dict[str, Any]:
+    with _lock:
+        return {"remaining": _remaining, "recent": list(_last_outputs), "directory": PROFILE_DIR}
+
+
+def begin(label: str) -> Optional[Capture]:
+    """Start a capture if one is armed, otherwise return ``None``."""
+    global _remaining
+    if not _remaining:
+        return None
+    with _lock:
+        if not _remaining:
+            return None
+        _remaining -= 1
+    return Capture(label)
+
+
+def current() -> Optional[Capture]:
+    return _CURRENT.get()
+
+
+@contextmanager
+def activate(cap: Optional[Capture]) -> Iterator[Optional[Capture]]:
+    """Make ``cap`` current if it isn't ``None``."""
+    if cap is None:
+        yield None
+        return
+    with cap.activate():
+        yield cap
+
+
+@contextmanager
+def capture(label: str) -> Iterator[Optional[Capture]]:
+    """Profile the enclosed transcription if a capture is armed."""
+    if _CURRENT.get() is not None:
+        yield _CURRENT.get()
+        return
+    cap = begin(label)
+    if cap is None:
+        yield None
+        return
+    try:
+        with cap.activate():
+            yield cap
+    finally:
+        cap.finish()
+
+
+@contextmanager
+def span(name: str) -> Iterator[None]:
+    """Record how long the enclosed block takes in the current capture."""
+    cap = _CURRENT.get()
+    if cap is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        cap.add_span(name, start, time.perf_counter())
+
+
+@contextmanager
+def profiled(name: str, torch_ops: bool = False) -> Iterator[None]:
+    """Like :func:`span` but also run the Python (and torch) profiler."""
+    cap = _CURRENT.get()
+    if cap is None:
+        yield
+        return
+    prof: Optional[cProfile.Profile] = cProfile.Profile()
+    try:
+        prof.enable()
+    except ValueError:  # another profiler is already active on this thread
+        prof = None
+    torch_prof = None
+    if torch_ops and "torch" in sys.modules:
+        from torch.profiler import ProfilerActivity, profile
+
+        torch_prof = profile(activities=[ProfilerActivity.CPU])
+        torch_prof.__enter__()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        end = time.perf_counter()
+        if torch_prof is not None:
+            torch_prof.__exit__(None, None, None)
+            cap.torch_tables.append(
+                torch_prof.key_averages().table(sort_by="cpu_time_total", row_limit=40)
+            )
+            cap.torch_traces.append(torch_prof)
+        if prof is not None:
+            prof.disable()
+            cap.profiles.append(prof)
+        cap.add_span(name, start, end)
@@ -0,0 +1,198 @@
+"""Concurrent load generator for the ClearSay API server.
+
+Start the server with the stub backend so results reflect the server and
+storage rather than model speed::
+
+    cd app && CLEARSAY_BACKEND=stub CLEARSAY_STUB_LATENCY=0.2 python server.py
+    python benchmarks/loadgen.py --users 8 --duration 30
+
+Each simulated user has its own session and mixes uploads, transcriptions of
+stored segments, recordings and discussion queries. Latency percentiles and
+error rates are reported per endpoint.
+"""
+
+import argparse
+import json
+import math
+import os
+import random
+import sys
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from typing import Any, Dict, List, Optional, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from synth import speech_like, to_wav_bytes  # noqa: E402
+
+SESSION_HEADER = "X-ClearSay-Session"
+
+# Relative weight of each action in a user's mix
+ACTIONS = {
+    "upload": 30,
+    "transcribe": 20,
+    "record": 10,
+    "current_discussion": 20,
+    "segments": 15,
+    "discussion_name": 5,
+}
+
+
+class Stats:
+    """Thread-safe latency and error collection per endpoint."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.latencies: Dict[str, List[float]] = {}
+        self.errors: Dict[str, Dict[str, int]] = {}
+
+    def record(self, endpoint: str, seconds: float, error: Optional[str]) -> None:
+        with self._lock:
+            self.latencies.setdefault(endpoint, []).append(seconds)
+            if error:
+                per = self.errors.setdefault(endpoint, {})
+                per[error] = per.get(error, 0) + 1
+
+    def summary(self, elapsed: float) -> Dict[str, Any]:
+        out = {}
+        for endpoint, values in sorted(self.latencies.items()):
+            ordered = sorted(values)
+            errors = self.errors.get(endpoint, {})
+            failed = sum(errors.values())
+            out[endpoint] = {
+                "requests": len(ordered),
+                "throughput": len(ordered) / elapsed if elapsed else 0.0,
+                "error_rate": failed / len(ordered),
+                "errors": errors,
+                "p50": percentile(ordered, 50),
+                "p95": percentile(ordered, 95),
+                "p99": percentile(ordered, 99),
+                "max": ordered[-1],
+            }
+        return out
+
+
+def percentile(ordered: List[float], pct: float) -> float:
+    if not ordered:
+        return 0.0
+    # nearest-rank percentile
+    index = min(len(ordered) - 1, max(0, math.ceil(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+class User:
+    """One simulated client with its own server session."""
+
+    def __init__(self, base_url: str, index: int, stats: Stats, clips: List[bytes], seed: int) -> None:
+        self.base_url = base_url.rstrip("/")
+        self.session = f"loadgen-{index}"
+        self.stats = stats
+        self.clips = clips
+        self.rng = random.Random(seed + index)
+        self.discussion: Optional[str] = None
+        self.segments: List[str] = []
+
+    def _request(
+        self, endpoint: str, method: str, path: str, body: Optional[bytes] = None,
+        content_type: str = "application/json",
+    ) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+        req = urllib.request.Request(self.base_url + path, data=body, method=method)
+        req.add_header(SESSION_HEADER, self.session)
+        if body is not None:
+            req.add_header("Content-Type", content_type)
+        start = time.perf_counter()
+        error = None
+        data = None
+        try:
+            with urllib.request.urlopen(req, timeout=120) as resp:
+                data = json.loads(resp.read() or b"null")
+        except urllib.error.HTTPError as exc:
+            error = f"http {exc.code}"
+        except Exception as exc:
+            error = type(exc).__name__
+        self.stats.record(endpoint, time.perf_counter() - start, error)
+        return data, error
+
+    def _json(self, payload: Dict[str, Any]) -> bytes:
+        return json.dumps(payload).encode("utf-8")
+
+    def step(self) -> None:
+        action = self.rng.choices(list(ACTIONS), weights=list(ACTIONS.values()))[0]
+        if action == "transcribe" and not self.segments:
+            action = "upload"
+        if action in ("segments", "discussion_name") and not self.discussion:
+            action = "current_discussion"
+
+        if action == "upload":
+            clip = self.rng.choice(self.clips)
+            data, error = self._request(
+                "transcribe_upload", "POST", "/transcribe_upload?persist=true", clip, "audio/wav"
+            )
+            if not error and data and data.get("segment"):
+                self.discussion = data["discussion"]
+                self.segments.append(f"{self.discussion}/{data['segment']}")
+        elif action == "transcribe":
+            seg = self.rng.choice(self.segments)
+            self._request("transcribe", "GET", "/transcribe?file=" + urllib.parse.quote(seg))
+        elif action == "record":
+            self._request("record", "POST", "/record", self._json({"action": "start"}))
+            time.sleep(self.rng.uniform(0.1, 0.5))
+            self._request("record", "POST", "/record", self._json({"action": "stop"}))
+        elif action == "current_discussion":
+            self._request("current_discussion", "GET", "/current_discussion")
+        elif action == "segments":
+            self._request("segments", "GET", f"/discussions/{self.discussion}/segments")
+        elif action == "discussion_name":
+            name = f"Load test {self.session}"
+            self._request("discussion_name", "POST", "/discussion_name", self._json({"name": name}))
+
+
+def run(base_url: str, users: int, duration: float, seed: int) -> Dict[str, Any]:
+    clips = [to_wav_bytes(speech_like(seconds, seed=seed + i)) for i, seconds in enumerate((2, 5, 10))]
+    stats = Stats()
+    deadline = time.monotonic() + duration
+
+    def loop(user: User) -> None:
+        while time.monotonic() < deadline:
+            user.step()
+
+    threads = [
+        threading.Thread(target=loop, args=(User(base_url, i, stats, clips, seed),), daemon=True)
+        for i in range(users)
+    ]
+    start = time.monotonic()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.monotonic() - start
+    return {"users": users, "duration": elapsed, "endpoints": stats.summary(elapsed)}
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Generate concurrent load against ClearSay")
+    parser.add_argument("--url", default="http://127.0.0.1:8000", help="server base URL")
+    parser.add_argument("--users", type=int, default=4, help="concurrent simulated users")
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds to run")
+    parser.add_argument("--seed", type=int, default=0, help="seed for the action mix and audio")
+    parser.add_argument("--output", help="write the report to this JSON file")
+    args = parser.parse_args(argv)
+
+    report = run(args.url, args.users, args.duration, args.seed)
+    print(f"{'endpoint':20s} {'reqs':>6s} {'req/s':>7s} {'err%':>6s} {'p50 ms':>8s} {'p95 ms':>8s} {'p99 ms':>8s}")
+    for endpoint, s in report["endpoints"].items():
+        print(
+            f"{endpoint:20s} {s['requests']:6d} {s['throughput']:7.1f} {s['error_rate'] * 100:6.1f}"
+            f" {s['p50'] * 1000:8.1f} {s['p95'] * 1000:8.1f} {s['p99'] * 1000:8.1f}"
+        )
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
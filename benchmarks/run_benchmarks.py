@@ -0,0 +1,249 @@
+"""Reproducible ClearSay performance benchmarks.
+
+Run from the repository root::
+
+    python benchmarks/run_benchmarks.py --output bench.json
+    python benchmarks/run_benchmarks.py --compare bench.json
+
+All audio is synthesized deterministically and every file is written to a
+temporary directory, so the suite runs offline on a CPU-only machine.
+Benchmarks whose dependencies are missing (model weights, fastapi) are
+reported as skipped rather than failing.
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "app"))
+sys.path.insert(0, HERE)
+
+import storage  # noqa: E402
+from storage import DiscussionStorage  # noqa: E402
+from synth import write_wav  # noqa: E402
+
+# Clip lengths (seconds) used for model latency
+CLIP_SECONDS = (5, 15, 30, 60)
+# Discussion sizes (segments) and archive sizes (discussions) for storage
+DISCUSSION_SIZES = (10, 100, 300)
+ARCHIVE_SIZES = (10, 100, 1000)
+# Default relative slowdown that counts as a regression
+DEFAULT_TOLERANCE = 0.25
+
+
+def _stats(samples: List[float], **extra: Any) -> Dict[str, Any]:
+    ordered = sorted(samples)
+    result = {
+        "median": statistics.median(ordered),
+        "mean": statistics.fmean(ordered),
+        "min": ordered[0],
+        "p95": ordered[min(len(ordered) - 1, int(round(0.95 * (len(ordered) - 1))))],
+        "runs": len(ordered),
+        "unit": "s",
+    }
+    result.update(extra)
+    return result
+
+
+def measure(func: Callable[[], Any], repeat: int = 5, warmup: int = 1) -> List[float]:
+    for _ in range(warmup):
+        func()
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return times
+
+
+class _TempDiscussions:
+    """Point storage at a throwaway discussions folder."""
+
+    def __enter__(self) -> str:
+        self.tmpdir = tempfile.mkdtemp(prefix="clearsay_bench_")
+        self.old_dir = storage.DISCUSSIONS_DIR
+        storage.DISCUSSIONS_DIR = os.path.join(self.tmpdir, "discussions")
+        os.makedirs(storage.DISCUSSIONS_DIR)
+        return self.tmpdir
+
+    def __exit__(self, *exc: Any) -> None:
+        storage.DISCUSSIONS_DIR = self.old_dir
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+
+# ----------------------------------------------------------------------
+# benchmarks
+# ----------------------------------------------------------------------
+def bench_model(results: Dict[str, Any], repeat: int) -> None:
+    try:
+        import model
+
+        model._load_model()
+    except Exception as exc:
+        results["model"] = {"skipped": f"model unavailable: {exc}"}
+        return
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for seconds in CLIP_SECONDS:
+            path = write_wav(os.path.join(tmpdir, f"clip{seconds}.wav"), seconds, seed=seconds)
+            times = measure(lambda: model.run_model(path), repeat=repeat)
+            results[f"model.run_model.{seconds}s"] = _stats(
+                times, real_time_factor=statistics.median(times) / seconds
+            )
+            # features are cached by the warm-up run
+            times = measure(lambda: model.run_model_cached(path), repeat=repeat)
+            results[f"model.run_model_cached.{seconds}s"] = _stats(
+                times, real_time_factor=statistics.median(times) / seconds
+            )
+
+
+def bench_storage(results: Dict[str, Any], repeat: int) -> None:
+    with _TempDiscussions() as tmpdir:
+        clip = write_wav(os.path.join(tmpdir, "clip.wav"), 3.0, seed=1)
+
+        for size in DISCUSSION_SIZES:
+            store = DiscussionStorage()
+            times = []
+            for i in range(size):
+                audio = os.path.join(tmpdir, f"in{i}.wav")
+                shutil.copyfile(clip, audio)
+                start = time.perf_counter()
+                store.add_segment(f"segment {i} " + "word " * 20, audio)
+                times.append(time.perf_counter() - start)
+            # latency of appends once the discussion has reached ``size``
+            results[f"storage.add_segment.{size}seg"] = _stats(times[-max(1, size // 10):])
+            retrans = measure(
+                lambda: store.retranscribe_last_segment(lambda _path: "retranscribed " * 20),
+                repeat=repeat,
+            )
+            results[f"storage.retranscribe.{size}seg"] = _stats(retrans)
+
+        for size in ARCHIVE_SIZES:
+            existing = len(DiscussionStorage().list())
+            for i in range(existing, size):
+                os.makedirs(os.path.join(storage.DISCUSSIONS_DIR, f"archive_{i:05d}"))
+            lister = DiscussionStorage()
+            results[f"storage.list.{size}disc"] = _stats(
+                measure(lambda: lister.list("archive"), repeat=repeat)
+            )
+
+
+def bench_server(results: Dict[str, Any], repeat: int, requests: int = 200) -> None:
+    try:
+        from fastapi.testclient import TestClient
+
+        import server
+    except BaseException as exc:  # server exits if fastapi is missing
+        results["server"] = {"skipped": f"server unavailable: {exc}"}
+        return
+    with _TempDiscussions() as tmpdir:
+        store = DiscussionStorage()
+        for i in range(20):
+            audio = write_wav(os.path.join(tmpdir, f"in{i}.wav"), 1.0, seed=i)
+            store.add_segment(f"segment {i}", audio)
+        routes = {
+            "health": "/health",
+            "current_discussion": "/current_discussion",
+            "segments": f"/discussions/{store.current_id}/segments",
+        }
+        client = TestClient(server.app)
+        for name, url in routes.items():
+            def run() -> None:
+                for _ in range(requests):
+                    client.get(url)
+
+            times = measure(run, repeat=repeat)
+            results[f"server.{name}"] = _stats(
+                [t / requests for t in times],
+                requests_per_second=requests / statistics.median(times),
+            )
+
+
+BENCHMARKS = {
+    "model": bench_model,
+    "storage": bench_storage,
+    "server": bench_server,
+}
+
+
+# ----------------------------------------------------------------------
+# comparison
+# ----------------------------------------------------------------------
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """Return descriptions of benchmarks slower than ``baseline``."""
+    regressions = []
+    for name, base in baseline.get("results", {}).items():
+        now = current.get("results", {}).get(name)
+        if not now or "median" not in now or "median" not in base:
+            continue
+        if base["median"] > 0 and now["median"] > base["median"] * (1 + tolerance):
+            change = now["median"] / base["median"] - 1
+            regressions.append(
+                f"{name}: {base['median']:.6f}s -> {now['median']:.6f}s (+{change:.0%})"
+            )
+    return regressions
+
+
+def run(selected: List[str], repeat: int) -> Dict[str, Any]:
+    results: Dict[str, Any] = {}
+    for name in selected:
+        print(f"Running {name} benchmarks...", flush=True)
+        BENCHMARKS[name](results, repeat)
+    return {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+        },
+        "results": results,
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Run ClearSay performance benchmarks")
+    parser.add_argument("--only", nargs="+", choices=sorted(BENCHMARKS), help="benchmarks to run")
+    parser.add_argument("--repeat", type=int, default=5, help="timed runs per benchmark")
+    parser.add_argument("--output", help="write results to this JSON file")
+    parser.add_argument("--compare", help="baseline JSON to check for regressions")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=DEFAULT_TOLERANCE,
+        help="relative slowdown allowed before flagging a regression",
+    )
+    args = parser.parse_args(argv)
+
+    report = run(args.only or list(BENCHMARKS), args.repeat)
+    for name, result in sorted(report["results"].items()):
+        if "skipped" in result:
+            print(f"{name:40s} skipped ({result['skipped']})")
+        else:
+            print(f"{name:40s} median {result['median'] * 1000:9.3f} ms  p95 {result['p95'] * 1000:9.3f} ms")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.tolerance)
+        if regressions:
+            print("Regressions against baseline:")
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+        print("No regressions against baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
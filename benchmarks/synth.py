@@ -0,0 +1,58 @@
+"""Deterministic speech-like audio for benchmarks.
+
+The signal alternates voiced "syllables" (a few harmonics of a drifting pitch
+under a smooth envelope) with short pauses, which exercises the same decoder
+and silence paths as real dictation without shipping recordings.
+"""
+
+import array
+import io
+import math
+import random
+import wave
+
+SAMPLE_RATE = 16000
+
+
+def speech_like(seconds: float, seed: int = 0, sample_rate: int = SAMPLE_RATE) -> array.array:
+    """Return ``seconds`` of 16-bit mono speech-like samples."""
+    rng = random.Random(seed)
+    total = int(seconds * sample_rate)
+    out = array.array("h", bytes(2 * total))
+    pos = 0
+    while pos < total:
+        if rng.random() < 0.25:
+            # pause between words
+            pos += int(rng.uniform(0.08, 0.4) * sample_rate)
+            continue
+        length = min(int(rng.uniform(0.12, 0.3) * sample_rate), total - pos)
+        f0 = rng.uniform(100.0, 220.0)
+        drift = rng.uniform(-0.3, 0.3)
+        # rough vowel formant weights for the first harmonics
+        weights = [1.0, rng.uniform(0.4, 0.9), rng.uniform(0.2, 0.6), rng.uniform(0.1, 0.3)]
+        amp = rng.uniform(0.2, 0.6) * 32767 / sum(weights)
+        phase = 0.0
+        for i in range(length):
+            t = i / length
+            env = 0.5 - 0.5 * math.cos(2 * math.pi * t)
+            phase += 2 * math.pi * f0 * (1 + drift * t) / sample_rate
+            value = sum(w * math.sin((k + 1) * phase) for k, w in enumerate(weights))
+            out[pos + i] = int(amp * env * value)
+        pos += length
+    return out
+
+
+def to_wav_bytes(samples: array.array, sample_rate: int = SAMPLE_RATE) -> bytes:
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(sample_rate)
+        wf.writeframes(samples.tobytes())
+    return buf.getvalue()
+
+
+def write_wav(path: str, seconds: float, seed: int = 0, sample_rate: int = SAMPLE_RATE) -> str:
+    with open(path, "wb") as f:
+        f.write(to_wav_bytes(speech_like(seconds, seed, sample_rate), sample_rate))
+    return path
@@ -0,0 +1,96 @@
+import os
+import sys
+import tempfile
+import time
+import unittest
+import wave
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "app"))
+
+import model
+from model import StubBackend
+
+
+class TestStubBackend(unittest.TestCase):
+    def setUp(self):
+        model.set_backend(StubBackend(latency=0.0, real_time_factor=0.1, text="stub text"))
+
+    def tearDown(self):
+        model._BACKEND = None
+        model._MODEL = None
+
+    def test_run_model_uses_stub(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "a.wav")
+            with wave.open(path, "wb") as wf:
+                wf.setnchannels(1)
+                wf.setsampwidth(2)
+                wf.setframerate(8000)
+                wf.writeframes(b"\0\0" * 8000)
+
+            start = time.perf_counter()
+            self.assertEqual(model.run_model(path), "stub text")
+            self.assertGreaterEqual(time.perf_counter() - start, 0.1)
+        self.assertEqual(model.status()["backend"], "stub")
+
+    def test_inference_waits_for_warm_up(self):
+        events = []
+
+        class SlowWarmUp(StubBackend):
+            def warm_up(self, model_):
+                time.sleep(0.2)
+                events.append("warm_up")
+
+            def transcribe_batch(self, model_, chunks):
+                events.append("transcribe")
+                return super().transcribe_batch(model_, chunks)
+
+            def transcribe(self, model_, audio):
+                events.append("transcribe")
+                return super().transcribe(model_, audio)
+
+            def transcribe_features(self, model_, features):
+                events.append("transcribe")
+                return super().transcribe_features(model_, features)
+
+        model.set_backend(SlowWarmUp(latency=0.0))
+        model.start_background_load()
+        try:
+            model.run_model(range(16000))
+        finally:
+            model._LOAD_THREAD.join()
+            model._LOAD_THREAD = None
+            model._DONE.clear()
+            model._STATUS["phase"] = "idle"
+        self.assertEqual(events, ["warm_up", "transcribe"])
+
+    def test_unknown_backend(self):
+        with self.assertRaises(ValueError):
+            model.set_backend("nope")
+
+
+class TestDecodeFallback(unittest.TestCase):
+    def result(self, no_speech_prob=0.1, avg_logprob=-0.3, compression_ratio=1.5):
+        return SimpleNamespace(
+            no_speech_prob=no_speech_prob, avg_logprob=avg_logprob, compression_ratio=compression_ratio
+        )
+
+    def test_confident_speech_is_kept(self):
+        self.assertFalse(model._needs_fallback(self.result()))
+        self.assertFalse(model._is_silent(self.result()))
+
+    def test_repetitive_or_unlikely_text_is_retried(self):
+        self.assertTrue(model._needs_fallback(self.result(compression_ratio=3.0)))
+        self.assertTrue(model._needs_fallback(self.result(avg_logprob=-1.5)))
+
+    def test_silence_is_blanked_not_retried(self):
+        silent = self.result(no_speech_prob=0.9, avg_logprob=-1.5)
+        self.assertTrue(model._is_silent(silent))
+        self.assertFalse(model._needs_fallback(silent))
+        # a likely transcript overrides the no-speech probability
+        self.assertFalse(model._is_silent(self.result(no_speech_prob=0.9)))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,78 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "app"))
+
+import chunking
+from model import StubBackend
+
+RATE = 100  # samples per second; keeps the synthetic signals small
+
+
+def speech(seconds, pauses):
+    """Loud samples with silent gaps at the ``(start, end)`` second ranges."""
+    samples = [1.0] * int(seconds * RATE)
+    for start, end in pauses:
+        for i in range(int(start * RATE), int(end * RATE)):
+            samples[i] = 0.0
+    return samples
+
+
+class RecordingBackend:
+    def __init__(self):
+        self.batches = []
+
+    def transcribe_batch(self, model, chunks):
+        self.batches.append(len(chunks))
+        return [f"chunk {len(chunk)}" for chunk in chunks]
+
+
+class TestChunking(unittest.TestCase):
+    def plan(self, audio):
+        frame = int(chunking.FRAME_SECONDS * RATE) or 1
+        return chunking.plan_chunks(len(audio), chunking.frame_energies(audio, frame), RATE)
+
+    def test_short_audio_is_one_chunk(self):
+        self.assertEqual(self.plan(speech(20, [])), [(0, 2000)])
+
+    def test_cuts_fall_in_silence_and_overlap(self):
+        audio = speech(70, [(22, 23), (48, 49)])
+        chunks = self.plan(audio)
+        self.assertEqual(len(chunks), 3)
+        self.assertEqual(chunks[0][0], 0)
+        self.assertEqual(chunks[-1][1], len(audio))
+        half = int(chunking.OVERLAP_SECONDS * RATE / 2)
+        for (_, end), (start, _) in zip(chunks, chunks[1:]):
+            self.assertEqual(end - start, 2 * half)
+            cut = start + half
+            self.assertEqual(audio[cut], 0.0)
+        for start, end in chunks:
+            self.assertLessEqual(end - start, chunking.MAX_CHUNK_SECONDS * RATE)
+
+    def test_without_energies_cuts_at_window_end(self):
+        chunks = chunking.plan_chunks(95 * RATE, None, RATE)
+        self.assertTrue(all(end - start <= 30 * RATE for start, end in chunks))
+        self.assertEqual(chunks[-1][1], 95 * RATE)
+
+    def test_stitch_removes_repeated_overlap(self):
+        texts = ["we went to the park.", "The park was busy", "busy and loud"]
+        self.assertEqual(chunking.stitch(texts), "we went to the park. was busy and loud")
+        self.assertEqual(chunking.stitch(["one two", "three"]), "one two three")
+        self.assertEqual(chunking.stitch(["", "hello"]), "hello")
+
+    def test_transcribe_long_batches_chunks(self):
+        backend = RecordingBackend()
+        audio = range(200 * chunking.SAMPLE_RATE)
+        text = chunking.transcribe_long(backend, None, audio, batch_size=4)
+        self.assertEqual(sum(backend.batches), len(chunking.split_on_silence(audio)))
+        self.assertEqual(backend.batches[0], 4)
+        self.assertTrue(text.startswith("chunk"))
+
+    def test_stub_batch(self):
+        stub = StubBackend(latency=0.0, text="hi")
+        self.assertEqual(stub.transcribe_batch(None, [range(10), range(20)]), ["hi", "hi"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,137 @@
+import importlib.util
+import json
+import os
+import sys
+import tempfile
+import unittest
+import wave
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "app"))
+
+import model
+from model import StubBackend
+from utils import features
+from utils.audio import sidecar_path
+
+HAVE_NUMPY = importlib.util.find_spec("numpy") is not None
+
+
+def write_wav(path, frames, value=0):
+    with wave.open(path, "wb") as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(16000)
+        wf.writeframes(value.to_bytes(2, "little", signed=True) * frames)
+
+
+class TestFeatureCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.wav = os.path.join(self.tmp.name, "seg001.wav")
+        write_wav(self.wav, 1600)
+        self.calls = 0
+        features._recent.clear()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def extract(self, path):
+        self.calls += 1
+        return [[float(self.calls)] * 4] * 2
+
+    def test_signature_follows_content(self):
+        first = features.wav_signature(self.wav)
+        self.assertEqual(features.wav_signature(self.wav), first)
+        write_wav(self.wav, 1600, value=5)
+        self.assertNotEqual(features.wav_signature(self.wav), first)
+
+    def test_extract_returning_none_is_not_cached(self):
+        self.assertIsNone(features.cached(self.wav, lambda path: None))
+        self.assertFalse(os.path.exists(features.features_path(self.wav)))
+
+    @unittest.skipUnless(HAVE_NUMPY, "numpy not installed")
+    def test_cache_hit_and_invalidation(self):
+        first = features.cached(self.wav, self.extract)
+        again = features.cached(self.wav, self.extract)
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(str(again.dtype), "float16")
+        self.assertEqual(again.tolist(), [[1.0] * 4] * 2)
+        self.assertEqual(len(first), 2)
+
+        # rewriting the audio invalidates the cache
+        write_wav(self.wav, 1600, value=7)
+        features.cached(self.wav, self.extract)
+        self.assertEqual(features.cached(self.wav, self.extract).tolist(), [[2.0] * 4] * 2)
+        self.assertEqual(self.calls, 2)
+
+        # so does metadata recomputed without the signature
+        with open(sidecar_path(self.wav), "w", encoding="utf-8") as f:
+            json.dump({"duration": 0.1}, f)
+        features.cached(self.wav, self.extract)
+        self.assertEqual(self.calls, 3)
+
+
+    def test_remembered_features_skip_extract(self):
+        features.remember(features.wav_signature(self.wav), [[9.0] * 4] * 2)
+        self.assertEqual(features.cached(self.wav, self.extract), [[9.0] * 4] * 2)
+        self.assertEqual(self.calls, 0)
+        # handed over once; afterwards they come from disk (or are extracted)
+        features.cached(self.wav, self.extract)
+        self.assertEqual(self.calls, 0 if HAVE_NUMPY else 1)
+
+    def test_remembered_features_are_bounded(self):
+        for i in range(features.RECENT_ENTRIES + 1):
+            features.remember(str(i), i)
+        self.assertIsNone(features._take("0"))
+        self.assertEqual(features._take(str(features.RECENT_ENTRIES)), features.RECENT_ENTRIES)
+
+
+class TestRunModelCached(unittest.TestCase):
+    def setUp(self):
+        model.set_backend(StubBackend(latency=0.0, text="cached text"))
+        features._recent.clear()
+
+    def tearDown(self):
+        model._BACKEND = None
+        model._MODEL = None
+
+    def test_stub_transcribes_stored_segment(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            wav = os.path.join(tmpdir, "seg001.wav")
+            write_wav(wav, 16000)
+            self.assertEqual(model.run_model_cached(wav), "cached text")
+            self.assertEqual(model.run_model_cached(wav), "cached text")
+            self.assertEqual(os.path.exists(features.features_path(wav)), HAVE_NUMPY)
+
+    @unittest.skipUnless(HAVE_NUMPY, "numpy not installed")
+    def test_features_follow_silence_chunks(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            wav = os.path.join(tmpdir, "seg001.wav")
+            write_wav(wav, 16000 * 70)
+            self.assertTrue(model.cache_features(wav))
+            self.assertEqual(features.load(wav, features.wav_signature(wav)).shape[0], 3)
+
+    @unittest.skipUnless(HAVE_NUMPY, "numpy not installed")
+    def test_first_transcription_features_are_cached(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            wav = os.path.join(tmpdir, "seg001.wav")
+            write_wav(wav, 16000 * 5)
+            self.assertEqual(model.run_model(wav), "cached text")
+            with mock.patch.object(model, "extract_features") as extract:
+                self.assertTrue(model.cache_features(wav))
+            extract.assert_not_called()
+            self.assertEqual(features.load(wav, features.wav_signature(wav)).shape, (1, 80, 500))
+
+    def test_long_audio_skips_cache_without_chunking(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            wav = os.path.join(tmpdir, "seg001.wav")
+            write_wav(wav, 16000 * 40)
+            with mock.patch.object(model, "LONG_AUDIO_CHUNKING", False):
+                self.assertFalse(model.cache_features(wav))
+                self.assertEqual(model.run_model_cached(wav), "cached text")
+            self.assertFalse(os.path.exists(features.features_path(wav)))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,36 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "app"))
+
+from utils import metrics
+from utils.metrics import Counter, Histogram, render
+
+
+class TestMetrics(unittest.TestCase):
+    def test_counter_and_histogram_render(self):
+        registry = []
+        counter = Counter("test_requests_total", "Requests.", ("route",), registry=registry)
+        counter.inc(route="/a")
+        counter.inc(2, route="/a")
+        hist = Histogram("test_latency_seconds", "Latency.", buckets=(0.1, 1.0), registry=registry)
+        hist.observe(0.05)
+        hist.observe(0.5)
+        hist.observe(5)
+
+        # test metrics stay out of the process-wide /metrics output
+        self.assertNotIn(counter, metrics._REGISTRY)
+        self.assertEqual(render(registry), render([counter, hist]))
+        text = render(registry)
+        self.assertIn("# TYPE test_requests_total counter", text)
+        self.assertIn('test_requests_total{route="/a"} 3', text)
+        self.assertIn('test_latency_seconds_bucket{le="0.1"} 1', text)
+        self.assertIn('test_latency_seconds_bucket{le="1"} 2', text)
+        self.assertIn('test_latency_seconds_bucket{le="+Inf"} 3', text)
+        self.assertIn("test_latency_seconds_count 3", text)
+        self.assertIn("test_latency_seconds_sum 5.55", text)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,75 @@
+import importlib.util
+import io
+import os
+import struct
+import sys
+import unittest
+import wave
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "app"))
+
+HAVE_NUMPY = importlib.util.find_spec("numpy") is not None
+
+if HAVE_NUMPY:
+    import numpy as np
+
+    from utils.pcm import decode_wav_bytes, pcm16_to_wav_bytes, resample, upload_to_wav_bytes
+
+
+def wav_bytes(samples, rate, channels=1, width=2):
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as wf:
+        wf.setnchannels(channels)
+        wf.setsampwidth(width)
+        wf.setframerate(rate)
+        wf.writeframes(samples)
+    return buf.getvalue()
+
+
+def tone(freq, rate, seconds=1.0):
+    t = np.arange(int(rate * seconds)) / rate
+    return np.sin(2 * np.pi * freq * t).astype(np.float32)
+
+
+def rms(samples):
+    # ignore the filter's edge effects
+    return float(np.sqrt(np.mean(samples[1000:-1000] ** 2)))
+
+
+@unittest.skipUnless(HAVE_NUMPY, "numpy not installed")
+class TestPcm(unittest.TestCase):
+    def test_pcm16_to_wav_bytes_drops_partial_frames(self):
+        data = pcm16_to_wav_bytes(struct.pack("<5h", 1, 2, 3, 4, 5), 8000, channels=2)
+        with wave.open(io.BytesIO(data), "rb") as wf:
+            self.assertEqual((wf.getnchannels(), wf.getframerate(), wf.getnframes()), (2, 8000, 2))
+
+    def test_decode_wav_bytes_mixes_down_and_scales(self):
+        stereo = wav_bytes(struct.pack("<4h", 16384, -16384, 16384, 0), 16000, channels=2)
+        self.assertEqual(decode_wav_bytes(stereo).tolist(), [0.0, 0.25])
+        eight_bit = wav_bytes(bytes([128, 192, 64]), 16000, width=1)
+        self.assertEqual(decode_wav_bytes(eight_bit).tolist(), [0.0, 0.5, -0.5])
+        self.assertEqual(decode_wav_bytes(wav_bytes(b"", 44100)).dtype, np.float32)
+
+    def test_upload_branches(self):
+        pcm = struct.pack("<4h", 0, 1000, -1000, 0)
+        wav = upload_to_wav_bytes(pcm, 16000)
+        self.assertEqual(wav[:4], b"RIFF")
+        self.assertEqual(len(decode_wav_bytes(wav)), 4)
+        # a WAV body is passed through untouched
+        self.assertEqual(upload_to_wav_bytes(bytearray(wav), 8000, channels=2), wav)
+        with self.assertRaises(ValueError):
+            upload_to_wav_bytes(pcm, 0)
+
+    def test_resample_keeps_passband(self):
+        for rate in (8000, 22050, 44100, 48000):
+            out = resample(tone(1000, rate), rate)
+            self.assertEqual(len(out), 16000)
+            self.assertAlmostEqual(rms(out), 0.5**0.5, places=2)
+
+    def test_resample_removes_content_above_nyquist(self):
+        # a 10 kHz tone can't be represented at 16 kHz and must not alias
+        self.assertLess(rms(resample(tone(10000, 44100), 44100)), 0.01)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,40 @@
+import json
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "app"))
+
+from utils import profiling
+from utils.fileio import atomic_write
+
+
+class TestProfiling(unittest.TestCase):
+    def test_capture_records_spans_and_profile(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            old_dir = profiling.PROFILE_DIR
+            profiling.PROFILE_DIR = os.path.join(tmpdir, "profiles")
+            try:
+                profiling.arm(1)
+                with profiling.capture("test") as cap:
+                    self.assertIsNotNone(cap)
+                    with profiling.profiled("add_segment"):
+                        atomic_write(os.path.join(tmpdir, "a.txt"), "hello")
+                self.assertEqual(profiling.status()["remaining"], 0)
+
+                with profiling.capture("test") as cap:
+                    self.assertIsNone(cap)
+
+                summary_path = profiling.status()["recent"][-1]
+                with open(summary_path, "r", encoding="utf-8") as f:
+                    summary = json.load(f)
+                self.assertEqual(summary["stages"]["atomic_write"]["calls"], 1)
+                self.assertIn("add_segment", summary["stages"])
+                self.assertTrue(os.path.exists(summary["python_profile"]))
+            finally:
+                profiling.PROFILE_DIR = old_dir
+
+
+if __name__ == "__main__":
+    unittest.main()
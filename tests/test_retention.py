@@ -0,0 +1,87 @@
+import os
+import sys
+import tempfile
+import time
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "app"))
+
+from retention import RecordingIndex, RetentionManager
+from utils.fileio import atomic_write
+
+
+class TestRetention(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = os.path.join(self.tmp.name, "recordings")
+        os.makedirs(self.dir)
+        self.now = time.time()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def recording(self, name, age, size=100):
+        path = os.path.join(self.dir, name)
+        atomic_write(path, b"x" * size)
+        os.utime(path, (self.now - age, self.now - age))
+        return path
+
+    def test_index_latest_without_rescanning(self):
+        self.recording("RECORDING_a.wav", age=300)
+        newer = self.recording("RECORDING_b.wav", age=100)
+        index = RecordingIndex(self.dir)
+        self.assertEqual(index.latest(), newer)
+
+        # files written later are only seen once registered
+        newest = self.recording("RECORDING_c.wav", age=10)
+        self.assertEqual(index.latest(), newer)
+        index.add(newest)
+        self.assertEqual(index.latest(), newest)
+
+        # moved into a discussion: falls back to the next newest
+        os.remove(newest)
+        self.assertEqual(index.latest(), newer)
+        self.assertEqual(len(index.entries()), 2)
+
+    def test_index_scans_session_folders(self):
+        os.makedirs(os.path.join(self.dir, "session"))
+        nested = self.recording(os.path.join("session", "RECORDING_a.wav"), age=100)
+        self.assertEqual(RecordingIndex(self.dir).latest(), nested)
+
+    def test_sweep_by_age_and_size(self):
+        old = self.recording("RECORDING_old.wav", age=3 * 3600)
+        mid = self.recording("RECORDING_mid.wav", age=2 * 3600)
+        recent = self.recording("RECORDING_recent.wav", age=3600)
+        fresh = self.recording("RECORDING_fresh.wav", age=10, size=1000)
+        manager = RetentionManager(
+            RecordingIndex(self.dir), max_age=2.5 * 3600, max_bytes=1100, grace=60
+        )
+
+        dry = manager.sweep(self.now, dry_run=True)
+        self.assertEqual(dry["reclaimed_bytes"], 200)
+        self.assertTrue(os.path.exists(old))
+
+        report = manager.sweep(self.now)
+        # old is past max_age; mid goes to get under max_bytes; the rest stay
+        self.assertEqual(report, {"removed": 2, "archived": 0, "reclaimed_bytes": 200, "remaining_bytes": 1100})
+        self.assertFalse(os.path.exists(old) or os.path.exists(mid))
+        self.assertTrue(os.path.exists(recent) and os.path.exists(fresh))
+
+        # files inside the grace period survive even over the size limit
+        manager.max_bytes = 0
+        report = manager.sweep(self.now)
+        self.assertEqual(report["removed"], 1)
+        self.assertTrue(os.path.exists(fresh))
+
+    def test_archive(self):
+        old = self.recording("RECORDING_old.wav", age=7200)
+        archive = os.path.join(self.tmp.name, "archive")
+        manager = RetentionManager(RecordingIndex(self.dir), max_age=3600, archive_dir=archive)
+        report = manager.sweep(self.now)
+        self.assertEqual(report["archived"], 1)
+        self.assertFalse(os.path.exists(old))
+        self.assertTrue(os.path.exists(os.path.join(archive, "RECORDING_old.wav")))
+
+
+if __name__ == "__main__":
+    unittest.main()
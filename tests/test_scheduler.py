@@ -0,0 +1,84 @@
+import os
+import sys
+import threading
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "app"))
+
+from scheduler import BULK, LIVE, RETRANSCRIBE, Superseded, TranscriptionScheduler
+from utils import profiling
+from utils.metrics import QUEUE_DEPTH
+
+
+class TestScheduler(unittest.TestCase):
+    def setUp(self):
+        self.scheduler = TranscriptionScheduler(workers=1)
+        self.release = threading.Event()
+        started = threading.Event()
+
+        def block():
+            started.set()
+            self.release.wait(5)
+
+        # occupy the only worker so later jobs queue up
+        self.scheduler.submit(block)
+        started.wait(5)
+
+    def tearDown(self):
+        self.release.set()
+        self.scheduler.shutdown()
+
+    def test_runs_in_priority_order(self):
+        order = []
+        jobs = [
+            self.scheduler.submit(order.append, "bulk", priority=BULK),
+            self.scheduler.submit(order.append, "retranscribe", priority=RETRANSCRIBE),
+            self.scheduler.submit(order.append, "live1", priority=LIVE),
+            self.scheduler.submit(order.append, "live2", priority=LIVE),
+        ]
+        self.assertEqual(self.scheduler.pending(), 4)
+        self.release.set()
+        for job in jobs:
+            job.result(timeout=5)
+        self.assertEqual(order, ["live1", "live2", "retranscribe", "bulk"])
+
+    def test_supersede_and_cancel_by_key(self):
+        first = self.scheduler.submit(str, 1, priority=BULK, key="seg")
+        second = self.scheduler.submit(str, 2, priority=BULK, key="seg")
+        other = self.scheduler.submit(str, 3, priority=BULK, key="other")
+        with self.assertRaises(Superseded):
+            first.result(timeout=0)
+        self.assertTrue(self.scheduler.cancel("other"))
+        self.assertFalse(self.scheduler.cancel("other"))
+        self.release.set()
+        self.assertEqual(second.result(timeout=5), "2")
+        self.assertTrue(other.cancelled())
+
+    def test_queue_depth_returns_to_zero(self):
+        before = QUEUE_DEPTH._values.get((), 0.0)
+        self.scheduler.submit(str, 1, key="seg")
+        last = self.scheduler.submit(str, 2, key="seg")
+        external = self.scheduler.submit(str, 3)
+        self.assertTrue(external.cancel())
+        self.release.set()
+        last.result(timeout=5)
+        self.scheduler.shutdown()
+        # only the blocking job from setUp had been counted beforehand
+        self.assertEqual(QUEUE_DEPTH._values.get((), 0.0), before - 1)
+
+    def test_exception_and_context_propagate(self):
+        def fail():
+            raise ValueError("boom")
+
+        cap = profiling.Capture("test")
+        with profiling.activate(cap):
+            seen = self.scheduler.submit(profiling.current)
+        failed = self.scheduler.submit(fail)
+        self.release.set()
+        self.assertIs(seen.result(timeout=5), cap)
+        with self.assertRaises(ValueError):
+            failed.result(timeout=5)
+
+
+if __name__ == "__main__":
+    unittest.main()
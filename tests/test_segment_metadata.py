@@ -0,0 +1,116 @@
+import array
+import importlib.util
+import json
+import math
+import os
+import sys
+import tempfile
+import unittest
+import wave
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "app"))
+
+import storage
+from storage import DiscussionStorage, backfill_metadata
+from utils import audio
+from utils.audio import analyze_wav
+
+HAVE_NUMPY = importlib.util.find_spec("numpy") is not None
+
+
+def write_tone(path, seconds=0.5, rate=8000, amplitude=0.5):
+    samples = array.array(
+        "h",
+        (int(amplitude * 32767 * math.sin(2 * math.pi * 440 * i / rate)) for i in range(int(seconds * rate))),
+    )
+    with wave.open(path, "wb") as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(rate)
+        wf.writeframes(samples.tobytes())
+
+
+class TestSegmentMetadata(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.old_dir = storage.DISCUSSIONS_DIR
+        storage.DISCUSSIONS_DIR = os.path.join(self.tmpdir.name, "discussions")
+        os.makedirs(storage.DISCUSSIONS_DIR, exist_ok=True)
+
+    def tearDown(self):
+        storage.DISCUSSIONS_DIR = self.old_dir
+        self.tmpdir.cleanup()
+
+    def test_analyze_wav(self):
+        path = os.path.join(self.tmpdir.name, "tone.wav")
+        write_tone(path)
+        info = analyze_wav(path, buckets=10)
+        self.assertAlmostEqual(info["duration"], 0.5)
+        self.assertAlmostEqual(info["peak"], 0.5, places=2)
+        self.assertAlmostEqual(info["rms"], 0.5 / math.sqrt(2), places=2)
+        self.assertEqual(len(info["peaks"]), 10)
+
+    @unittest.skipUnless(HAVE_NUMPY, "numpy not installed")
+    def test_numpy_levels_match_stdlib(self):
+        import numpy as np
+
+        path = os.path.join(self.tmpdir.name, "tone.wav")
+        write_tone(path, seconds=0.3)
+        for width, channels in ((2, 1), (2, 2)):
+            raw, _, _, _ = audio._read_wav(path)
+            frames = len(raw) // width // channels
+            self.assertEqual(
+                audio._levels(raw, width, channels, frames, 7),
+                audio._levels_numpy(np, raw, width, channels, frames, 7),
+            )
+
+    def test_add_segment_writes_sidecar(self):
+        store = DiscussionStorage()
+        audio = os.path.join(self.tmpdir.name, "a.wav")
+        write_tone(audio)
+        store.add_segment("hello", audio)
+
+        seg = store.segments[0]
+        self.assertAlmostEqual(seg["duration"], 0.5)
+        self.assertIn("rms", seg)
+        self.assertTrue(os.path.exists(os.path.join(store.discussion_path, seg["meta"])))
+
+        loaded = store.load_segments(store.current_id, with_peaks=True)
+        self.assertEqual(len(loaded[0]["peaks"]), 200)
+
+    def test_add_segment_data(self):
+        store = DiscussionStorage()
+        audio = os.path.join(self.tmpdir.name, "a.wav")
+        write_tone(audio)
+        with open(audio, "rb") as f:
+            data = f.read()
+        store.add_segment_data("hello", data)
+
+        seg = store.segments[0]
+        self.assertEqual(seg["wav"], os.path.join("audio", "seg001.wav"))
+        with open(os.path.join(store.discussion_path, seg["wav"]), "rb") as f:
+            self.assertEqual(f.read(), data)
+        self.assertAlmostEqual(seg["duration"], 0.5)
+
+    def test_backfill(self):
+        store = DiscussionStorage()
+        audio = os.path.join(self.tmpdir.name, "a.wav")
+        write_tone(audio)
+        store.add_segment("hello", audio)
+        seg_path = store.segments_json
+        with open(seg_path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        for seg in data["segments"]:
+            os.remove(os.path.join(store.discussion_path, seg.pop("meta")))
+            seg["duration"] = 0.0
+        with open(seg_path, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+
+        self.assertEqual(backfill_metadata(), 1)
+        self.assertEqual(backfill_metadata(), 0)
+        loaded = store.load_segments(store.current_id)
+        self.assertAlmostEqual(loaded[0]["duration"], 0.5)
+
+
+if __name__ == "__main__":
+    unittest.main()
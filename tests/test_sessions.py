@@ -0,0 +1,115 @@
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "app"))
+
+import storage
+from sessions import SessionManager
+from storage import DiscussionStorage
+from utils.fileio import atomic_write
+
+
+class TestConcurrentDiscussions(unittest.TestCase):
+    def test_same_second_discussions_do_not_collide(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            old_dir = storage.DISCUSSIONS_DIR
+            storage.DISCUSSIONS_DIR = os.path.join(tmpdir, "discussions")
+            try:
+                stores = [DiscussionStorage() for _ in range(3)]
+                for i, store in enumerate(stores):
+                    audio = os.path.join(tmpdir, f"{i}.wav")
+                    atomic_write(audio, b"data")
+                    store.add_segment(f"text {i}", audio)
+
+                ids = {store.current_id for store in stores}
+                self.assertEqual(len(ids), 3)
+                for i, store in enumerate(stores):
+                    self.assertEqual(store.load(store.current_id).strip(), f"text {i}")
+                    other = DiscussionStorage()
+                    self.assertTrue(other.open_discussion(store.current_id))
+                    self.assertEqual(len(other.segments), 1)
+            finally:
+                storage.DISCUSSIONS_DIR = old_dir
+
+    def test_storages_sharing_a_discussion_see_each_others_segments(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            old_dir = storage.DISCUSSIONS_DIR
+            storage.DISCUSSIONS_DIR = os.path.join(tmpdir, "discussions")
+            try:
+                first = DiscussionStorage()
+                audio = os.path.join(tmpdir, "0.wav")
+                atomic_write(audio, b"data")
+                first.add_segment("one", audio)
+                second = DiscussionStorage()
+                second.open_discussion(first.current_id)
+
+                for i, store in enumerate([second, first, second], start=1):
+                    audio = os.path.join(tmpdir, f"{i}.wav")
+                    atomic_write(audio, b"data")
+                    store.add_segment(f"text {i}", audio)
+
+                ids = [seg["id"] for seg in second.segments]
+                self.assertEqual(ids, ["seg001", "seg002", "seg003", "seg004"])
+                self.assertEqual(first.segment_count, 3)
+            finally:
+                storage.DISCUSSIONS_DIR = old_dir
+
+    def test_segments_stay_in_their_discussion(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            old_dir = storage.DISCUSSIONS_DIR
+            storage.DISCUSSIONS_DIR = os.path.join(tmpdir, "discussions")
+            try:
+                first, second = DiscussionStorage(), DiscussionStorage()
+                first.add_segment_data("first", b"data")
+                second.add_segment_data("second", b"data")
+                foreign = os.path.join(first.audio_dir, "seg001.wav")
+
+                self.assertIsNone(second.find_segment(foreign))
+                self.assertFalse(second.update_segment("stolen", foreign))
+                self.assertFalse(second.add_segment("stolen", foreign))
+                self.assertFalse(DiscussionStorage().add_segment("stolen", foreign))
+                self.assertTrue(os.path.exists(foreign))
+                self.assertEqual(len(second.segments), 1)
+
+                self.assertTrue(first.update_segment("redone", foreign))
+                self.assertEqual(first.load(first.current_id).strip(), "redone")
+            finally:
+                storage.DISCUSSIONS_DIR = old_dir
+
+
+class TestSessionManager(unittest.TestCase):
+    def test_sessions_are_isolated_and_evicted(self):
+        manager = SessionManager(idle_timeout=0)
+        a = manager.get("a")
+        self.assertIs(manager.get("a"), a)
+        self.assertIsNot(manager.get("b").storage, a.storage)
+        # recordings go to a separate folder per session
+        self.assertNotEqual(manager.get("b").recorder.directory, a.recorder.directory)
+        self.assertEqual(os.path.dirname(a.recorder.directory), os.path.dirname(manager.get("b").recorder.directory))
+        self.assertEqual(sorted(manager.evict_idle()), ["a", "b"])
+        self.assertEqual(len(manager), 0)
+
+    def test_workers_share_a_sessions_discussion(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            old_dir = storage.DISCUSSIONS_DIR
+            storage.DISCUSSIONS_DIR = os.path.join(tmpdir, "discussions")
+            try:
+                # one manager per pre-forked worker, sharing the state folder
+                workers = [SessionManager(state_dir=os.path.join(tmpdir, "sessions")) for _ in range(2)]
+                for i, manager in enumerate(workers * 2):
+                    session = manager.get("client")
+                    with session.synced():
+                        session.storage.add_segment_data(f"text {i}", b"data")
+                ids = {manager.get("client").storage.current_id for manager in workers}
+                self.assertEqual(len(ids), 1)
+                self.assertEqual(len(workers[1].get("client").storage.segments), 4)
+                with workers[0].get("other").synced():
+                    self.assertIsNone(workers[0].get("other").storage.current_id)
+            finally:
+                storage.DISCUSSIONS_DIR = old_dir
+
+
+if __name__ == "__main__":
+    unittest.main()
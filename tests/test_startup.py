@@ -0,0 +1,64 @@
+import importlib.util
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+APP_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app")
+
+# Seconds allowed for importing everything the desktop window needs
+STARTUP_BUDGET = float(os.environ.get("CLEARSAY_STARTUP_BUDGET", "1.5"))
+# Modules that must only load in the background
+HEAVY_MODULES = ("torch", "whisper", "numpy", "sounddevice")
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+for name in sys.argv[1:]:
+    __import__(name)
+elapsed = time.perf_counter() - start
+import recorder, storage
+recorder.Recorder()
+storage.DiscussionStorage()
+print(json.dumps({"seconds": elapsed, "loaded": sorted(sys.modules)}))
+"""
+
+
+def probe(*modules):
+    """Import ``modules`` in a fresh interpreter and report what got loaded."""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        env = dict(os.environ, TMPDIR=tmpdir, CLEARSAY_BACKEND="whisper")
+        out = subprocess.run(
+            [sys.executable, "-c", PROBE, *modules],
+            cwd=APP_DIR,
+            env=env,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout
+        result = json.loads(out.strip().splitlines()[-1])
+        result["tmp_entries"] = os.listdir(tmpdir)
+    return result
+
+
+class TestStartup(unittest.TestCase):
+    def check(self, *modules):
+        result = probe(*modules)
+        heavy = [m for m in HEAVY_MODULES if m in result["loaded"]]
+        self.assertEqual(heavy, [], f"imported at startup: {heavy}")
+        self.assertLess(result["seconds"], STARTUP_BUDGET)
+        # directories are created on first write, not on import
+        self.assertEqual(result["tmp_entries"], [])
+
+    def test_core_imports_within_budget(self):
+        self.check("constants", "model", "scheduler", "sessions", "storage", "recorder")
+
+    @unittest.skipIf(importlib.util.find_spec("customtkinter") is None, "customtkinter not installed")
+    def test_ui_imports_within_budget(self):
+        self.check("app", "ui")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,70 @@
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "app"))
+
+import storage
+from storage import DiscussionStorage
+from utils.fileio import atomic_write
+
+
+class TestStorageEvents(unittest.TestCase):
+    def test_events_for_add_update_rename(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            old_dir = storage.DISCUSSIONS_DIR
+            storage.DISCUSSIONS_DIR = os.path.join(tmpdir, "discussions")
+            try:
+                store = DiscussionStorage()
+                events = []
+                store.subscribe(lambda event, info: events.append((event, info)))
+
+                audio = os.path.join(tmpdir, "a.wav")
+                atomic_write(audio, b"data")
+                store.add_segment("hello", audio)
+                store.add_segment("again", os.path.join(store.audio_dir, "seg001.wav"))
+                store.set_name("Practice")
+                store.add_segment("", audio)
+                store.new()
+
+                names = [e for e, _ in events]
+                self.assertEqual(names, ["segment_added", "segment_updated", "renamed", "reset"])
+                self.assertEqual(events[0][1]["segment"]["id"], "seg001")
+                self.assertEqual(
+                    events[0][1]["wav"],
+                    os.path.join(storage.DISCUSSIONS_DIR, events[0][1]["id"], "audio", "seg001.wav"),
+                )
+                self.assertTrue(os.path.exists(events[0][1]["wav"]))
+                self.assertEqual(events[1][1]["text"], "again")
+            finally:
+                storage.DISCUSSIONS_DIR = old_dir
+
+    def test_retranscribe_event_and_segment_text(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            old_dir = storage.DISCUSSIONS_DIR
+            storage.DISCUSSIONS_DIR = os.path.join(tmpdir, "discussions")
+            try:
+                store = DiscussionStorage()
+                for i in range(3):
+                    audio = os.path.join(tmpdir, f"{i}.wav")
+                    atomic_write(audio, b"data")
+                    store.add_segment(f"text {i}", audio)
+                events = []
+                store.subscribe(lambda event, info: events.append((event, info)))
+                store.retranscribe_last_segment(lambda _path: " redone ")
+
+                event, info = events[-1]
+                self.assertEqual(event, "segment_updated")
+                self.assertEqual(info["segment"]["id"], "seg003")
+                self.assertEqual(info["text"], "redone")
+                segments = store.load_segments(store.current_id)
+                texts = [store.load_segment_text(store.current_id, seg) for seg in segments]
+                self.assertEqual(texts, ["text 0", "text 1", "redone"])
+                self.assertEqual(store.load_segment_text(store.current_id, {"txt": "missing.txt"}), "")
+            finally:
+                storage.DISCUSSIONS_DIR = old_dir
+
+
+if __name__ == "__main__":
+    unittest.main()